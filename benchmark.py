@@ -0,0 +1,566 @@
+"""
+    Benchmarks of EmoPlay
+"""
+
+import argparse
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+# Custom classes
+import corpus
+import disambiguator
+import emotions as vocabulary
+import play
+import senticnet
+import speech
+import vizualisation
+
+# Fixed subsets of theater/ measured by the suite (see runSuite):
+# the three smallest plays, the play of median size and the largest
+subsets = {
+    'small':[
+        'PokerbyZoraNealeHurston15902.xml',
+        'DerTagorTheTragicManbyJMJamesMatthewBarrie39178.xml',
+        'InShadowoftheGlenbyJMJohnMillingtonSynge1618.xml'
+    ],
+    'median':['TheUnknownAPlayinThreeActsbyWSomersetWilliamSomers49771.xml'],
+    'largest':['DramaticTechniquebyGeorgePierceBaker36580.xml']
+}
+
+# Bumped whenever the results of the suite are not comparable with older ones
+suite_format = 2
+
+def sampleSpeeches(paths, size=200, seed=0):
+    """ Draws a reproducible sample of speeches from plays.
+    Args:
+        paths (list): Paths to the xml files.
+        size (int): Amount of speeches in the sample.
+        seed (int): Seed of the random sample.
+    Returns: list
+        New Speech objects (text, scene and id of the drawn speeches),
+        in the order of the plays.
+    """
+
+    rows = []
+
+    for path in sorted(paths):
+        p = play.Play(path, streaming=True)
+        if p.speech_amount == 0:
+            continue
+        for s in p.speaker_speech.speech:
+            rows.append((s.text, s.scene, s.id))
+
+    rows = random.Random(seed).sample(rows, min(size, len(rows)))
+
+    return [speech.Speech(text, scene, speech_id) for text, scene, speech_id in rows]
+
+def compareStrategies(texts, strategies=None, reference='max_similarity', stcnet=None):
+    """ Disambiguates the same lines with several strategies and
+        compares them with a reference strategy.
+
+        Agreement is the share of the content words disambiguated
+        by the reference (tokens having a synset) which get the same
+        synset. With a senticnet, emotions are also extracted, and
+        emotion agreement is the share of lines having the same
+        primary and secondary emotions as with the reference.
+
+    Args:
+        texts (list): The lines (or Speech objects, whose text is used).
+        strategies (list): The strategies to compare, all by default
+            (see Disambiguator.strategies).
+        reference (str): The strategy the others are compared with.
+        stcnet (Senticnet): Optional senticnet, to compare emotions.
+    Returns: dict
+        The results of each strategy, by name.
+    Examples:
+        >>> results = compareStrategies(sampleSpeeches(glob.glob('theater/*.xml')))
+        >>> results['first_sense']['agreement']
+        0.61
+    """
+
+    texts = [t.text if isinstance(t, speech.Speech) else t for t in texts]
+    strategies = list(strategies or disambiguator.Disambiguator.strategies)
+
+    # The reference is run first, the others are compared with it
+    if reference in strategies:
+        strategies.remove(reference)
+    strategies.insert(0, reference)
+
+    speeches = {}
+    results = {}
+
+    for strategy in strategies:
+        speeches[strategy] = [speech.Speech(text, 0, i) for i, text in enumerate(texts)]
+
+        start = time.time()
+        play.Play.disambiguateSpeeches(speeches[strategy], strategy=strategy)
+        seconds = time.time() - start
+
+        tokens = sum(len(s.pywsdNames) for s in speeches[strategy])
+
+        results[strategy] = {
+            'speeches':len(texts),
+            'tokens':tokens,
+            'seconds':round(seconds, 3),
+            'speeches_per_second':round(len(texts) / seconds, 1) if seconds else None,
+            'tokens_per_second':round(tokens / seconds, 1) if seconds else None,
+            'agreement':agreementOf(speeches[reference], speeches[strategy])
+        }
+
+        if stcnet is not None:
+            play.Play.scoreSpeeches(speeches[strategy], stcnet)
+            same = sum(
+                (a.primary_emotion, a.secondary_emotion) == (b.primary_emotion, b.secondary_emotion)
+                for a, b in zip(speeches[reference], speeches[strategy])
+            )
+            results[strategy]['emotion_agreement'] = round(same / len(texts), 3) if texts else None
+
+    return results
+
+def agreementOf(references, speeches):
+    """ Returns the share of the tokens having a synset in the
+        reference speeches which get the same synset in the others.
+    """
+
+    found = 0
+    same = 0
+
+    for a, b in zip(references, speeches):
+        for (_, _, expected), (_, _, synset) in zip(a.pywsdNames, b.pywsdNames):
+            if expected is not None:
+                found += 1
+                same += expected == synset
+
+    return round(same / found, 3) if found else None
+
+def renderingSpeed(paths, folder='.', workers=1):
+    """ Measures how fast the plots of exported plays are saved,
+        as in a corpus run (see corpus.renderPlots).
+    Args:
+        paths (list): Paths to the xml files.
+        folder (str): Folder of the CSV files exported by a run,
+            plays without CSV file being skipped.
+        workers (int): Amount of worker processes (1 is serial).
+    Returns: dict
+        The amount of plays and plots, the time taken and the
+        amount of plots saved per second.
+    Examples:
+        >>> renderingSpeed(glob.glob('theater/*.xml'), 'csv', workers=4)['plots_per_second']
+        5.4
+    """
+
+    # Data of the plots of each play, prepared beforehand
+    jobs = []
+    for path in sorted(paths):
+        p = play.Play(path, streaming=True)
+        csv_path = os.path.join(folder, f"{p.title} - Exported.csv")
+
+        if os.path.exists(csv_path):
+            p.from_csv(csv_path)
+            jobs.append((p.title, vizualisation.Vizualisation.framesOf(p)))
+
+    start = time.time()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(corpus.renderPlots, *zip(*jobs)))
+        else:
+            results = [corpus.renderPlots(title, frames) for title, frames in jobs]
+
+    seconds = time.time() - start
+    plots = sum(len(names) for names, _, _ in results)
+
+    return {
+        'plays':len(jobs),
+        'plots':plots,
+        'workers':workers,
+        'seconds':round(seconds, 3),
+        'plots_per_second':round(plots / seconds, 2) if seconds else None
+    }
+
+def timeRuns(run, repeat=3, setup=None):
+    """ Times several runs of a function, discarding its prints.
+    Args:
+        run (function): The measured function.
+        repeat (int): Amount of runs.
+        setup (function): Optional function called before each run,
+            untimed, returning the arguments of run (a tuple).
+    Returns: dict
+        The best and median times of the runs, in seconds.
+    Examples:
+        >>> timeRuns(lambda: play.Play('theater/hamlet.xml', streaming=True))
+        {'best': 0.0512, 'median': 0.0534, 'repeat': 3}
+    """
+
+    times = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            args = setup() if setup else ()
+
+            start = time.perf_counter()
+            run(*args)
+            times.append(time.perf_counter() - start)
+
+    return {'best':round(min(times), 4), 'median':round(statistics.median(times), 4), 'repeat':repeat}
+
+def throughput(timing, amount, unit):
+    """ Adds the amount of items processed per second (at best) to a timing. """
+
+    timing.update({
+        'items':amount,
+        'unit':unit,
+        'per_second':round(amount / timing['best'], 1) if timing['best'] else None
+    })
+
+    return timing
+
+def writeSenticnet(path, words, size=2000, seed=0):
+    """ Writes a small synthetic senticnet file, in the format of
+        the real one, so that the suite runs without it.
+
+        The most frequent words get random (but reproducible)
+        emotions, and random synonyms among the words which follow
+        them: these are only found through reverseSearch.
+
+    Args:
+        path (str): Path of the senticnet file.
+        words (iterable): Words of the plays, lowercased.
+        size (int): Amount of entries.
+        seed (int): Seed of the random emotions and synonyms.
+    Returns: str
+        The path of the file.
+    """
+
+    counts = collections.Counter(word for word in words if word.isalpha())
+    ranked = sorted(counts, key=lambda word: (-counts[word], word))[:2 * size]
+    moods = [f'#{name}' for name in vocabulary.names[1:]]
+    draw = random.Random(seed)
+
+    with open(path, 'w', encoding='utf-8') as senticnetFile:
+        senticnetFile.write('# Synthetic senticnet (see benchmark.writeSenticnet)\nsenticnet = {}\n')
+
+        for word in ranked[:size]:
+            values = [f'{draw.uniform(-1, 1):.3f}' for _ in range(4)]
+            values += [draw.choice(moods), draw.choice(moods)]
+            values += [draw.choice(['positive', 'negative']), f'{draw.uniform(-1, 1):.3f}']
+            values += draw.sample(ranked, min(5, len(ranked)))
+            senticnetFile.write(f"senticnet['{word}'] = {values!r}\n")
+
+    return path
+
+def loadPlays(paths):
+    """ Loads plays from their xml files (streaming), discarding prints. """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [play.Play(path, streaming=True) for path in paths]
+
+def stubSpeeches(speeches):
+    """ Stands in for the disambiguation and the tokenization of
+        speeches, without NLTK data nor WordNet: words are split with
+        a plain regular expression (see Speech.splitWords) and get
+        no synset, as with the 'none' strategy.
+    Args:
+        speeches (list): Speech instances.
+    Returns:
+        None
+    """
+
+    for s in speeches:
+        words = speech.Speech.splitWords(s.text)
+
+        s.pywsd_output = [(word, word.lower(), None) for word in words]
+        s.wsd_strategy = 'none'
+        s.text_disambiguate = ' '.join(words)
+        s.tokenized_text = words
+
+def forgetLookups(stcnet):
+    """ Forgets the emotions remembered by senticnet and the synsets
+        remembered by the speeches, so that each run of a benchmark
+        starts cold instead of measuring the memos of the runs before.
+    """
+
+    stcnet.clearMemo()
+    speech.Speech.synset_cache.clear()
+
+def runSuite(folder=None, senticnet_path=None, repeat=3, wsd_strategy='max_similarity', wsd_speeches=50):
+    """ Runs the benchmark suite on the fixed subsets of the corpus
+        (see subsets).
+
+        For the whole suite, it measures the loads of senticnet (from
+        the source file and from its compiled cache), and the lookups
+        of emotionsOf and reverseSearch on every word of the small
+        plays. For each subset, it measures:
+
+            - play_load: loading the plays from their xml files
+            - make_characters: grouping their speeches by character
+            - scoring_stub: scoring their speeches with a stub of the
+              disambiguation and tokenization (see stubSpeeches)
+            - scoring_<wsd_strategy>: scoring their first speeches
+              with real disambiguation
+            - to_csv and from_csv: exporting the plays scored with the
+              stub and loading them back
+            - plot_prep: preparing the data of their graphics
+
+        Real disambiguation is skipped if the NLTK data (tokenizer,
+        tagger, WordNet) is missing. The stub needs none.
+
+        Each benchmark is run several times, on fresh plays and with
+        the memos of the lookups forgotten, and keeps its best and
+        median times. Without senticnet_path, a synthetic senticnet
+        made up from the words of the plays is used (see
+        writeSenticnet): it is the same at each run, so results
+        stay comparable (see compareResults).
+
+    Args:
+        folder (str): Folder of the xml files, theater/ next to this
+            file by default.
+        senticnet_path (str): Path to senticnet, synthetic by default.
+        repeat (int): Amount of runs of each benchmark.
+        wsd_strategy (str): Strategy of the real disambiguation.
+        wsd_speeches (int): Amount of speeches of each play scored
+            with real disambiguation.
+    Returns: dict
+        The results, ready for JSON: the environment, the senticnet
+        and plays used, and the timing of each benchmark by name
+        (e.g. 'median.play_load'), and the benchmarks skipped.
+    Raises:
+        FileNotFoundError: If a play of the subsets is missing from
+            the folder.
+    Examples:
+        >>> results = runSuite(repeat=5)
+        >>> results['benchmarks']['largest.scoring_stub']['per_second']
+        2210.4
+    """
+
+    if folder is None:
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'theater')
+
+    missing = [f for files in subsets.values() for f in files if not os.path.isfile(os.path.join(folder, f))]
+    if missing:
+        raise FileNotFoundError(f'Plays of the benchmark suite missing from "{folder}": {", ".join(missing)}')
+
+    plays = {name:loadPlays([os.path.join(folder, f) for f in files]) for name, files in subsets.items()}
+    benchmarks = {}
+    skipped = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Senticnet
+        if senticnet_path is None:
+            words = [w.lower() for ps in plays.values() for p in ps for s in p.getSpeeches() for w in s.rawTokens]
+            senticnet_path = writeSenticnet(os.path.join(workdir, 'senticnet.py'), words)
+            synthetic = True
+        else:
+            synthetic = False
+
+        benchmarks['senticnet_load_source'] = timeRuns(lambda: senticnet.Senticnet(senticnet_path, cache=False), repeat)
+
+        # Compiles the cache before timing its loads
+        with contextlib.redirect_stdout(io.StringIO()):
+            stcnet = senticnet.Senticnet(senticnet_path)
+        benchmarks['senticnet_load_cache'] = timeRuns(lambda: senticnet.Senticnet(senticnet_path), repeat)
+
+        # Lookups, on every word of the small plays
+        words = [w.lower() for p in plays['small'] for s in p.getSpeeches() for w in s.rawTokens]
+
+        for lookup in (stcnet.emotionsOf, stcnet.reverseSearch):
+            timing = timeRuns(lambda lookup=lookup: [lookup(w) for w in words], repeat)
+            benchmarks[lookup.__name__] = throughput(timing, len(words), 'lookups')
+
+        for name, files in subsets.items():
+            paths = [os.path.join(folder, f) for f in files]
+            speeches = sum(len(p.getSpeeches()) for p in plays[name])
+
+            timing = timeRuns(lambda: loadPlays(paths), repeat)
+            benchmarks[f'{name}.play_load'] = throughput(timing, speeches, 'speeches')
+
+            def unindexed(plays=plays[name]):
+                for p in plays:
+                    p.characters = []
+                return (plays,)
+            timing = timeRuns(lambda ps: [p.makeCharacters() for p in ps], repeat, unindexed)
+            benchmarks[f'{name}.make_characters'] = throughput(timing, speeches, 'speeches')
+
+            # Speeches are scored again on fresh plays, cold, at each run
+            def fresh(limit=None):
+                forgetLookups(stcnet)
+                return ([s for p in loadPlays(paths) for s in p.getSpeeches()[:limit]],)
+
+            def stubbed(ss):
+                stubSpeeches(ss)
+                play.Play.scoreSpeeches(ss, stcnet)
+
+            timing = timeRuns(stubbed, repeat, fresh)
+            benchmarks[f'{name}.scoring_stub'] = throughput(timing, speeches, 'speeches')
+
+            # Real disambiguation, on the first speeches of each play
+            try:
+                timing = timeRuns(
+                    lambda ss: play.Play.scoreSpeeches(ss, stcnet, strategy=wsd_strategy), repeat,
+                    lambda: fresh(wsd_speeches)
+                )
+                sampled = sum(len(p.getSpeeches()[:wsd_speeches]) for p in plays[name])
+                benchmarks[f'{name}.scoring_{wsd_strategy}'] = throughput(timing, sampled, 'speeches')
+
+            except LookupError:
+                print(f'# NLTK data could not be found (see nltk.download), skipping {name}.scoring_{wsd_strategy}.')
+                skipped.append(f'{name}.scoring_{wsd_strategy}')
+
+            # Exports the plays scored with the stub
+            scored = loadPlays(paths)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for p in scored:
+                    stubbed(p.getSpeeches())
+            csv_paths = [os.path.join(workdir, f'{name}{i}.csv') for i in range(len(scored))]
+
+            timing = timeRuns(lambda: [p.to_csv(path) for p, path in zip(scored, csv_paths)], repeat)
+            benchmarks[f'{name}.to_csv'] = throughput(timing, speeches, 'speeches')
+
+            def reloaded():
+                ps = loadPlays(paths)
+                for p, path in zip(ps, csv_paths):
+                    p.from_csv(path)
+                return (ps,)
+
+            timing = timeRuns(
+                lambda ps: [p.from_csv(path) for p, path in zip(ps, csv_paths)], repeat,
+                lambda: (loadPlays(paths),)
+            )
+            benchmarks[f'{name}.from_csv'] = throughput(timing, speeches, 'speeches')
+
+            # Speeches remember their words count, graphics are prepared on fresh plays
+            timing = timeRuns(lambda ps: [vizualisation.Vizualisation.prepareFrames(p) for p in ps], repeat, reloaded)
+            benchmarks[f'{name}.plot_prep'] = throughput(timing, speeches, 'speeches')
+
+    return {
+        'format':suite_format,
+        'date':datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment':{
+            'python':platform.python_version(),
+            'platform':platform.platform(),
+            'cpus':os.cpu_count()
+        },
+        'repeat':repeat,
+        'senticnet':{
+            'path':None if synthetic else senticnet_path,
+            'synthetic':synthetic,
+            'version':stcnet.version,
+            'entries':len(stcnet.senticnet)
+        },
+        'wsd':{'strategy':wsd_strategy, 'speeches':wsd_speeches},
+        'subsets':{
+            name:[{'file':f, 'speeches':len(p.getSpeeches())} for f, p in zip(files, plays[name])]
+            for name, files in subsets.items()
+        },
+        'skipped':skipped,
+        'benchmarks':benchmarks
+    }
+
+def compareResults(baseline, results, tolerance=0.1):
+    """ Compares the results of the suite with those of a former run.
+    Args:
+        baseline (dict): The results of the former run (see runSuite).
+        results (dict): The new results.
+        tolerance (float): Relative change of the best time beyond
+            which a benchmark is reported as slower or faster.
+    Returns: dict
+        For each benchmark of both runs, the best times before and
+        after, their ratio and a verdict ('slower', 'faster' or
+        'same'). Settings changing the measures (senticnet,
+        disambiguation, plays) are reported under 'warnings'.
+    Examples:
+        >>> compareResults(json.load(open('before.json')), runSuite())['median.play_load']
+        {'before': 0.0712, 'after': 0.0534, 'ratio': 0.75, 'verdict': 'faster'}
+    """
+
+    comparison = {'warnings':[]}
+
+    for key in ('format', 'senticnet', 'wsd', 'subsets', 'skipped'):
+        if baseline.get(key) != results.get(key):
+            comparison['warnings'].append(f'{key} differs, results may not be comparable')
+
+    for name, timing in results['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if not before or not before['best']:
+            continue
+
+        ratio = timing['best'] / before['best']
+        verdict = 'slower' if ratio > 1 + tolerance else 'faster' if ratio < 1 - tolerance else 'same'
+        comparison[name] = {'before':before['best'], 'after':timing['best'], 'ratio':round(ratio, 2), 'verdict':verdict}
+
+    return comparison
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares the disambiguation strategies on a sample of theater/.')
+    parser.add_argument('--folder', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'theater'),
+                        help='folder of the xml files (default: theater/ next to this file)')
+    parser.add_argument('--sample', type=int, default=200,
+                        help='amount of speeches drawn from the plays (default: 200)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the sample (default: 0)')
+    parser.add_argument('--senticnet', default=None,
+                        help='path to senticnet, to also compare emotions (the suite makes up a small one by default)')
+    parser.add_argument('--output', default=None,
+                        help='path to a JSON file for the results')
+    parser.add_argument('--render', default=None,
+                        help='measures the plots of the plays exported to this folder instead')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='amount of worker processes drawing plots (default: 1, serial)')
+    parser.add_argument('--suite', action='store_true',
+                        help='runs the benchmark suite on fixed subsets of theater/ instead')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='amount of runs of each benchmark of the suite (default: 3)')
+    parser.add_argument('--wsd', choices=disambiguator.Disambiguator.strategies, default='max_similarity',
+                        help='strategy of the real disambiguation of the suite (default: max_similarity)')
+    parser.add_argument('--wsd-speeches', type=int, default=50,
+                        help='amount of speeches of each play disambiguated by the suite (default: 50)')
+    parser.add_argument('--baseline', default=None,
+                        help='path to the JSON results of a former suite, to compare with')
+    args = parser.parse_args()
+
+    if args.suite:
+        results = runSuite(folder=args.folder, senticnet_path=args.senticnet, repeat=args.repeat,
+                           wsd_strategy=args.wsd, wsd_speeches=args.wsd_speeches)
+
+        for name, timing in results['benchmarks'].items():
+            print(f"# {name}: {timing['best']}s (median {timing['median']}s)"
+                  + (f", {timing['per_second']} {timing['unit']}/s" if 'per_second' in timing else ''))
+
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as baselineFile:
+                comparison = compareResults(json.load(baselineFile), results)
+
+            for warning in comparison.pop('warnings'):
+                print(f'# Warning : {warning}')
+            for name, change in comparison.items():
+                print(f"# {name}: {change['before']}s -> {change['after']}s (x{change['ratio']}, {change['verdict']})")
+
+    elif args.render:
+        results = renderingSpeed(glob.glob(os.path.join(args.folder, "*.xml")), args.render, args.workers)
+        print(f"# {results['plots']} plot(s) of {results['plays']} play(s) in {results['seconds']}s "
+              f"({results['plots_per_second']} plot(s)/s with {args.workers} worker(s))")
+
+    else:
+        stcnet = senticnet.Senticnet(args.senticnet) if args.senticnet else None
+        results = compareStrategies(sampleSpeeches(glob.glob(os.path.join(args.folder, "*.xml")), args.sample, args.seed), stcnet=stcnet)
+
+        for name, result in results.items():
+            print(f"# {name}: {result['speeches_per_second']} speeches/s, "
+                  f"{result['tokens_per_second']} tokens/s, agreement {result['agreement']}"
+                  + (f", emotion agreement {result['emotion_agreement']}" if 'emotion_agreement' in result else ''))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as outputFile:
+            json.dump(results, outputFile, indent=1)
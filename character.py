@@ -2,6 +2,9 @@
     Module Character
 """
 
+# Custom classes
+import emotions as vocabulary
+
 class Character:
     """
         Character class.
@@ -14,16 +17,87 @@ class Character:
         It requires the Speech class to work as expected.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, loader=None):
         """ Constructor.
         Args:
             name (str): The name of the character.
+            loader (callable): Optional function returning the speeches
+                of the character, only called when they are first
+                accessed (see speeches).
         """
         self.name = name
-        self.speeches = []
+        self.loader = loader
+        self._speeches = None if loader else []
+        self.scene_index = {} # Speeches of each scene, in order
+        self.emotion_tallies = {} # Cached emotion counts, by scene (see tallyEmotions)
+        self._word_count = None # Cached amount of words (see countWords)
         self.primary_emotion = None
         self.secondary_emotion = None
 
+    @property
+    def speeches(self):
+        """ The list of Speech objects of the character.
+            When the character has a loader, the speeches are
+            materialized on first access.
+
+            Speeches must be attached with addSpeech, or by setting
+            the whole list, so that the scene index is kept up to date.
+        """
+
+        if self._speeches is None:
+            self.speeches = self.loader()
+
+        return self._speeches
+
+    @speeches.setter
+    def speeches(self, value):
+        self._speeches = value
+        self.loader = None
+
+        # Rebuilds the scene index
+        self.scene_index = {}
+        self.emotion_tallies = {}
+        self._word_count = None
+        for speech in value:
+            speech.character = self
+            self.scene_index.setdefault(speech.scene, []).append(speech)
+
+    def addSpeech(self, speech):
+        """ Attaches a speech to the character.
+        Args:
+            speech (Speech): The speech.
+        Returns:
+            None
+        Examples:
+            >>> character.addSpeech(speech.Speech('To be, or not to be', 1, 1))
+        """
+
+        self.speeches.append(speech)
+
+        speech.character = self
+        self.scene_index.setdefault(speech.scene, []).append(speech)
+        self.invalidateEmotions(speech.scene)
+        self.invalidateCounts()
+
+    def invalidateEmotions(self, scene):
+        """ Forgets the emotion counts of a scene, and of the whole
+            play, after the emotions of one of its speeches changed.
+        Args:
+            scene (int): The scene number.
+        Returns:
+            None
+        """
+
+        self.emotion_tallies.pop(scene, None)
+        self.emotion_tallies.pop(None, None)
+
+    def invalidateCounts(self):
+        """ Forgets the amount of words of the character, after its
+            speeches or the text of one of them changed.
+        """
+
+        self._word_count = None
+
     def getSpeeches(self, scene=0):
         """ Returns the speeches of the specified scene.
         Args:
@@ -40,11 +114,48 @@ class Character:
 
             """
 
-        return [
-            speech
-            for speech in self.speeches
-            if scene > 0 and speech.scene == scene or scene <= 0
-        ]
+        # Builds the speeches (and the scene index) of a lazy character
+        speeches = self.speeches
+
+        if scene > 0:
+            return list(self.scene_index.get(scene, []))
+
+        return list(speeches)
+
+    def tallyEmotions(self, scene=0):
+        """ Counts the primary and secondary emotions of the speeches of
+            a scene, by emotion code (see the emotions module) and in order
+            of first appearance. Counts are cached until the emotions of a
+            speech of the scene change.
+        Args:
+            scene (int): The scene number. If 0, counts for the whole play.
+        Returns:
+            tuple: The counts of primary emotions and of secondary emotions (dicts).
+        Examples:
+            >>> character.tallyEmotions(1)
+            ({2: 2, 0: 1}, {15: 2, 23: 1})
+        """
+
+        key = scene if scene > 0 else None
+
+        if key not in self.emotion_tallies:
+            primary_emotions = {}
+            secondary_emotions = {}
+
+            # Loops through each speech and stores emotions
+            for speech in self.getSpeeches(scene):
+                primary_emotion = speech.primary_code
+                secondary_emotion = speech.secondary_code
+
+                # Adds to dict (primary emotions)
+                primary_emotions[primary_emotion] = primary_emotions.get(primary_emotion, 0) + 1
+
+                # Adds to dict (secondary emotions)
+                secondary_emotions[secondary_emotion] = secondary_emotions.get(secondary_emotion, 0) + 1
+
+            self.emotion_tallies[key] = (primary_emotions, secondary_emotions)
+
+        return self.emotion_tallies[key]
 
     def getEmotions(self, scene=0):
         """ Estimates the general emotion of the character throughout the play.
@@ -63,36 +174,12 @@ class Character:
 
         """
 
-        speeches = self.getSpeeches(scene)
-
         # Finds the average primary/secondary emotion for all the speeches
-        primary_emotions = {}
-        secondary_emotions = {}
-
-        # Loops through each speech and stores emotions
-        for speech in speeches:
-            primary_emotion = speech.primary_emotion
-            secondary_emotion = speech.secondary_emotion
-
-            # Adds to dict (primary emotions)
-            if primary_emotion in primary_emotions:
-                primary_emotions[primary_emotion] += 1
-            else:
-                primary_emotions[primary_emotion] = 1
-
-            # Adds to dict (secondary emotions)
-            if secondary_emotion in secondary_emotions:
-                secondary_emotions[secondary_emotion] += 1
-            else:
-                secondary_emotions[secondary_emotion] = 1
-
-        # Removes "None"
-        primary_emotions[None] = -1
-        secondary_emotions[None] = -1
-
-        # Finds max
-        primary_emotion_max = max(primary_emotions, key=primary_emotions.get)
-        secondary_emotion_max = max(secondary_emotions, key=secondary_emotions.get)
+        primary_emotions, secondary_emotions = self.tallyEmotions(scene)
+
+        # Finds max, "None" being ignored
+        primary_emotion_max = vocabulary.nameOf(vocabulary.maxOf(primary_emotions))
+        secondary_emotion_max = vocabulary.nameOf(vocabulary.maxOf(secondary_emotions))
 
         # Finally setting values as attributes, if scene = 0 (i.e. whole play)
         if scene < 1:
@@ -112,10 +199,11 @@ class Character:
 
         """
 
-        # Loops through each speech and makes the sum
-        wordCount = sum([speech.countWords for speech in self.speeches])
+        # Loops through each speech and makes the sum, once
+        if self._word_count is None:
+            self._word_count = sum(speech.countWords for speech in self.speeches)
 
-        return wordCount
+        return self._word_count
 
     @property
     def countSpeeches(self):
@@ -0,0 +1,97 @@
+"""
+    Module Checkpoint
+"""
+
+import hashlib
+import os
+import pickle
+
+class Checkpoint:
+    """
+        Checkpoint class.
+
+        It keeps the speeches of a play already processed by a
+        corpus run, so that a run which was interrupted resumes the
+        play where it stopped instead of starting it again.
+
+        The file starts with the fingerprint of the run, followed by
+        one pickled list of speech states per processed chunk. Chunks
+        are only appended, so a crash can at most truncate the last
+        one, which is then ignored.
+    """
+
+    def __init__(self, play_path, fingerprint, directory="cache/checkpoints"):
+        """ Constructor.
+        Args:
+            play_path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of the current run.
+            directory (str): Directory of the checkpoint files.
+        """
+
+        self.fingerprint = fingerprint
+        self.path = os.path.join(
+            directory,
+            hashlib.sha1(play_path.encode('utf-8')).hexdigest() + '.pickle'
+        )
+
+    def load(self):
+        """ Reads the speech states saved by a previous run.
+        Returns: list
+            The states of the first speeches of the play, in order,
+            empty if there is no checkpoint for the current fingerprint.
+        Examples:
+            >>> checkpoint = Checkpoint('theater/play.xml', fingerprint)
+            >>> for s, state in zip(play.getSpeeches(), checkpoint.load()):
+            ...     s.__setstate__(state)
+        """
+
+        states = []
+        end = 0
+
+        try:
+            with open(self.path, 'rb') as checkpointFile:
+                if pickle.load(checkpointFile) != self.fingerprint:
+                    self.reset()
+                    return []
+                end = checkpointFile.tell()
+
+                while True:
+                    states.extend(pickle.load(checkpointFile))
+                    end = checkpointFile.tell()
+
+        except IOError:
+            return []
+
+        except (EOFError, pickle.UnpicklingError, ValueError, AttributeError):
+            # Drops what follows the last complete chunk (or the
+            # whole file if even the fingerprint is unreadable)
+            if end:
+                os.truncate(self.path, end)
+            else:
+                self.reset()
+
+        return states
+
+    def append(self, states):
+        """ Saves the states of the next processed speeches.
+        Args:
+            states (list): States of the speeches (see Speech.__getstate__).
+        Returns:
+            None
+        """
+
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'wb') as checkpointFile:
+                pickle.dump(self.fingerprint, checkpointFile)
+
+        with open(self.path, 'ab') as checkpointFile:
+            pickle.dump(states, checkpointFile)
+
+    def reset(self):
+        """ Removes the checkpoint, e.g. when it belongs to another
+            fingerprint or once the play is exported.
+        """
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,667 @@
+"""
+    Module Corpus
+"""
+
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import json
+import os
+import time
+
+# Custom classes
+import checkpoint
+import corpusvizualisation
+import disambiguationcache
+import disambiguator
+import instrumentation
+import manifest
+import play
+import senticnet
+import sharedsenticnet
+import vizualisation
+
+# Senticnet, disambiguation cache and disambiguator opened
+# once by each worker process (see initWorker)
+worker_senticnet = None
+worker_cache = None
+worker_disambiguator = None
+
+def initWorker(senticnet_path, cache_path=None, strategy='max_similarity'):
+    """ Loads senticnet once in a worker process.
+
+        Workers map the shared senticnet store, so that they all
+        use the same physical copy of it. Each worker keeps one
+        disambiguator for all the speeches it processes.
+
+        Args:
+            senticnet_path (str): Path to the senticnet file
+            cache_path (str): Path to the disambiguation cache (optional)
+            strategy (str): Disambiguation strategy (see Disambiguator)
+        Returns:
+            None
+    """
+
+    global worker_senticnet, worker_cache, worker_disambiguator
+    worker_senticnet = sharedsenticnet.SharedSenticnet(senticnet_path)
+    worker_disambiguator = disambiguator.Disambiguator(strategy)
+
+    if cache_path:
+        worker_cache = disambiguationcache.DisambiguationCache(cache_path)
+
+def scoreSpeeches(speeches):
+    """ Computes the emotions of speeches in a worker process.
+
+        Args:
+            speeches (list): Speech objects to process
+        Returns: tuple
+            The state of each processed speech, in the same order,
+            the cache and memo counters for these speeches and the
+            time spent in each stage (see Instrumentation)
+    """
+
+    before = countersOf(worker_senticnet, worker_cache, worker_disambiguator)
+    stages = instrumentation.stages.snapshot()
+
+    play.Play.scoreSpeeches(speeches, worker_senticnet, worker_cache, worker_disambiguator)
+
+    # Worker caches are never closed: hits are written once per chunk
+    if worker_cache is not None:
+        worker_cache.flush()
+
+    counters = countersOf(worker_senticnet, worker_cache, worker_disambiguator)
+    counters.subtract(before)
+
+    return ([s.__getstate__() for s in speeches], counters, instrumentation.stages.since(stages))
+
+def renderPlots(title, frames):
+    """ Saves the plots of a play from their prepared data, in a
+        worker process (or in this one for serial runs).
+
+        Figures are drawn headless and released once saved (see
+        Vizualisation), so that workers do not grow over the corpus.
+
+        Args:
+            title (str): The title of the play
+            frames (dict): The data of the plots (see Vizualisation.framesOf)
+        Returns: tuple
+            The names of the saved files, the time spent drawing
+            them, in seconds, and the time spent in each stage
+    """
+
+    start = time.time()
+    stages = instrumentation.stages.snapshot()
+
+    names = vizualisation.Vizualisation.saveAll(title, frames)
+
+    return (names, time.time() - start, instrumentation.stages.since(stages))
+
+def countersOf(stcnet, cache=None, wsd=None):
+    """ Returns the hit/miss counters of a senticnet memo, of
+        a disambiguation cache and of the similarity memo of a
+        disambiguator.
+
+        Args:
+            stcnet (Senticnet): The senticnet
+            cache (DisambiguationCache): The disambiguation cache, if any
+            wsd (Disambiguator): The disambiguator, if any
+        Returns: Counter
+            The counters, by name
+    """
+
+    counters = collections.Counter({
+        'memo_hits':stcnet.memo_hits,
+        'memo_misses':stcnet.memo_misses
+    })
+
+    if cache:
+        counters['cache_hits'] = cache.hits
+        counters['cache_misses'] = cache.misses
+
+    if wsd:
+        counters['similarity_hits'] = wsd.score_hits
+        counters['similarity_misses'] = wsd.score_misses
+
+    return counters
+
+class Corpus:
+    """
+        Corpus class.
+
+        It is used to run the whole EmoPlay pipeline (emotions,
+        CSV export and plots) on a list of plays, either one play
+        after the other or with a pool of worker processes.
+
+        In parallel mode, the speeches of each play are sent to
+        the workers (in several chunks for large plays), while
+        the results are exported in the order of the plays, so
+        that the files are the same as with a serial run. Plots
+        are then drawn by the workers too, from the data of the
+        plays only.
+
+        Each play is also summarized in a small table (see
+        Play.summaryFrame), from which the plays of the corpus are
+        compared once they are all exported (see compare).
+
+        The time spent in each stage of the pipeline is measured for
+        each play and for the whole run (see Instrumentation), and
+        can be written to a JSON report.
+
+        Runs are incremental: plays already exported with the same
+        xml file, senticnet and settings are skipped (see Manifest),
+        and a play interrupted by a crash resumes from the last
+        chunk of speeches saved (see Checkpoint).
+    """
+
+    # Changes whenever the pipeline gives different results, so
+    # that plays processed by an older version are processed again:
+    #   2: disambiguation strategy recorded in the exported files
+    #   3: summary table of each play
+    #   4: position of the scenes in the summary tables
+    #   5: emotions of the speeches filled (see Speech.getMaxEmotion)
+    #   6: words counted on the raw text (see Speech.countWords)
+    #   7: empty and NaN emotion labels mean no emotion (see emotions.codeOf)
+    #   8: division of each speech in the exported files
+    pipeline_version = 8
+
+    def __init__(self, paths, workers=1, senticnet_path="senticnet/senticnet.py",
+                 cache_path="cache/disambiguation.sqlite", chunk_size=250, lookahead=None,
+                 manifest_path="cache/manifest.json", checkpoint_dir="cache/checkpoints",
+                 resume=True, wsd_strategy='max_similarity', report_path=None, profile_path=None):
+        """ Constructor.
+        Args:
+            paths (list): Paths to the xml files.
+            workers (int): Amount of worker processes (1 is serial).
+            senticnet_path (str): Path to the senticnet file.
+            cache_path (str): Path to the disambiguation cache,
+                None to always disambiguate.
+            chunk_size (int): Amount of speeches sent to a worker at once
+                (and saved at once to the checkpoint of a play).
+            lookahead (int): Amount of plays processed ahead of the export
+                (twice the amount of workers by default).
+            manifest_path (str): Path to the manifest of processed plays,
+                None to process every play.
+            checkpoint_dir (str): Directory of the checkpoints of
+                interrupted plays, None to disable them.
+            resume (bool): Skips up to date plays and resumes interrupted
+                ones; False processes everything again.
+            wsd_strategy (str): Disambiguation strategy (see
+                Disambiguator.strategies), recorded in the settings
+                of the run.
+            report_path (str): Path to the JSON report of the time
+                spent in each stage, None to not write it.
+            profile_path (str): Path to a cProfile dump of the run
+                (pstats), None to not profile. Meant for a single
+                play processed serially, as workers are not profiled.
+        """
+
+        self.paths = paths
+        self.workers = workers
+        self.senticnet_path = senticnet_path
+        self.cache_path = cache_path
+        self.chunk_size = chunk_size
+        self.lookahead = lookahead or 2 * workers
+        self.manifest_path = manifest_path
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self.wsd_strategy = wsd_strategy
+        self.report_path = report_path
+        self.profile_path = profile_path
+        self.manifest = None
+
+        # Cache and memo counters of the last run, with the amount
+        # of plots and the time spent drawing them
+        self.counters = collections.Counter()
+
+        # Plays whose plots are being drawn by the workers
+        self.rendering = collections.deque()
+
+        # Summary file of each exported play, by xml path
+        self.summaries = {}
+
+        # Time spent in each stage of the last run, for the whole
+        # run, by the workers, and by play (with their titles)
+        self.stages = instrumentation.Instrumentation()
+        self.worker_stages = instrumentation.Instrumentation()
+        self.play_stages = {}
+        self.titles = {}
+
+    def run(self, plots=True):
+        """ Processes every play of the corpus which is not up to date.
+        Args:
+            plots (bool): Generates and saves the plots of each play.
+        Returns:
+            None
+        Examples:
+            >>> c = Corpus(glob.glob("theater/*.xml"), workers=4)
+            >>> c.run()
+        """
+
+        self.counters = collections.Counter()
+        self.rendering = collections.deque()
+        self.summaries = {}
+        self.worker_stages = instrumentation.Instrumentation()
+        self.play_stages = {}
+        self.titles = {}
+
+        start = time.time()
+        before = instrumentation.stages.snapshot()
+
+        if self.profile_path:
+            profiler = instrumentation.profile(self.profile_path)
+        else:
+            profiler = contextlib.nullcontext()
+
+        with profiler:
+            if self.manifest_path:
+                self.manifest = manifest.Manifest(self.manifest_path)
+
+            plays = self.plan(plots)
+
+            if self.workers > 1 and plays:
+                self.runParallel(plays, plots)
+            elif plays:
+                self.runSerial(plays, plots)
+
+            # Compares the plays of the corpus
+            if plots:
+                self.compare()
+
+        # Stages of this process and of the workers
+        self.stages = instrumentation.stages.since(before)
+        self.stages.update(self.worker_stages)
+
+        # Prints the hit rates of the caches
+        for name, label in (('cache', 'Disambiguation cache'), ('similarity', 'Similarity memo'),
+                            ('memo', 'Token emotions memo')):
+            hits = self.counters[name + '_hits']
+            misses = self.counters[name + '_misses']
+            if hits + misses > 0:
+                print(f'# {label}: {hits} hit(s), {misses} miss(es) ({round(100 * hits / (hits + misses), 1)}% hits)')
+
+        # Prints the drawing speed of the plots
+        if self.counters['plots'] and self.counters['plot_seconds']:
+            seconds = self.counters['plot_seconds']
+            print(f"# Plots: {self.counters['plots']} saved in {round(seconds, 1)}s of drawing "
+                  f"({round(self.counters['plots'] / seconds, 1)} plot(s)/s per process)")
+
+        # Prints the longest stages
+        longest = list(self.stages.report().items())[:6]
+        if longest:
+            print('# Time by stage: ' + ', '.join(f"{stage} {round(measure['seconds'], 1)}s" for stage, measure in longest))
+
+        if self.report_path:
+            self.writeReport(time.time() - start)
+
+    def plan(self, plots=True):
+        """ Lists the plays to process, with the fingerprint of
+            this run for each of them (None if the file cannot be read).
+        Args:
+            plots (bool): Generates and saves the plots of each play.
+        Returns: list
+            A list of (path, fingerprint), in the order of the paths.
+        """
+
+        try:
+            version = senticnet.Senticnet.hashFile(self.senticnet_path)
+        except IOError:
+            version = None # Reported when senticnet is loaded
+
+        settings = {'pipeline':self.pipeline_version, 'plots':plots, 'wsd':self.wsd_strategy}
+
+        plays = []
+        skipped = 0
+
+        for path in self.paths:
+            try:
+                fingerprint = {
+                    'xml':senticnet.Senticnet.hashFile(path),
+                    'senticnet':version,
+                    'settings':settings
+                }
+            except IOError:
+                fingerprint = None
+
+            if self.resume and fingerprint and self.manifest and self.manifest.isUpToDate(path, fingerprint):
+                skipped += 1
+                self.summaries[path] = self.manifest.plays[path]['artifacts'][1] # See finish
+            else:
+                plays.append((path, fingerprint))
+
+        if skipped:
+            print(f'# {skipped} play(s) already up to date, skipped.')
+
+        return plays
+
+    def restore(self, path, fingerprint, speeches):
+        """ Restores the speeches of a play saved by an interrupted run.
+        Args:
+            path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of this run.
+            speeches (list): Speeches of the play, in order.
+        Returns: tuple
+            The checkpoint of the play (None if disabled) and the
+            amount of speeches already processed.
+        """
+
+        if not self.checkpoint_dir or not fingerprint:
+            return (None, 0)
+
+        playCheckpoint = checkpoint.Checkpoint(path, fingerprint, self.checkpoint_dir)
+
+        if not self.resume:
+            playCheckpoint.reset()
+            return (playCheckpoint, 0)
+
+        states = playCheckpoint.load()[:len(speeches)]
+
+        for s, state in zip(speeches, states):
+            s.__setstate__(state)
+
+        if states:
+            print(f'# Resuming play at speech {len(states) + 1} of {len(speeches)}.')
+
+        return (playCheckpoint, len(states))
+
+    def runSerial(self, plays, plots=True):
+        """ Processes plays, one after the other, in this process.
+        Args:
+            plays (list): The plays to process (see plan).
+            plots (bool): Generates and saves the plots of each play.
+        Returns:
+            None
+        """
+
+        stcnet = None
+        cache = None
+        wsd = disambiguator.Disambiguator(self.wsd_strategy)
+
+        for path, fingerprint in plays:
+            before = instrumentation.stages.snapshot()
+
+            # Loads the play into a new object
+            p = play.Play(path, streaming=True)
+
+            # Avoids processing not found plays
+            if p.speech_amount == 0:
+                continue
+
+            # Loads senticnet [mandatory for emotions' search]
+            # once a play needs it
+            if stcnet is None:
+                loading = instrumentation.stages.snapshot()
+                stcnet = senticnet.Senticnet(self.senticnet_path)
+
+                if self.cache_path:
+                    cache = disambiguationcache.DisambiguationCache(self.cache_path)
+
+                # Senticnet is loaded for the whole corpus, not for the play
+                before.update(instrumentation.stages.since(loading))
+
+            speeches = p.getSpeeches()
+            playCheckpoint, done = self.restore(path, fingerprint, speeches)
+
+            # Gets the emotions for each speech of each character
+            # of the play, by batches saved to the checkpoint
+            for start in range(done, len(speeches), self.chunk_size):
+                chunk = speeches[start:start + self.chunk_size]
+                play.Play.scoreSpeeches(chunk, stcnet, cache, wsd)
+
+                if playCheckpoint:
+                    playCheckpoint.append([s.__getstate__() for s in chunk])
+
+            print(f'# Successfully extracted emotions for play "{p.title}"')
+
+            self.finish(path, fingerprint, p, playCheckpoint, plots)
+
+            self.measure(path, p, instrumentation.stages.since(before))
+
+        if stcnet is not None:
+            self.counters.update(countersOf(stcnet, cache, wsd))
+
+        if cache:
+            cache.close()
+
+    def runParallel(self, plays, plots=True):
+        """ Processes plays with a pool of worker processes.
+            Plays are loaded and exported in this process, in order,
+            while their speeches are processed by the workers.
+        Args:
+            plays (list): The plays to process (see plan).
+            plots (bool): Generates and saves the plots of each play.
+        Returns:
+            None
+        """
+
+        # Compiles the shared store once, before the workers map it
+        sharedsenticnet.SharedSenticnet(self.senticnet_path).close()
+
+        with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=initWorker,
+                initargs=(self.senticnet_path, self.cache_path, self.wsd_strategy)) as pool:
+
+            # Plays being processed, in order
+            pending = collections.deque()
+
+            for path, fingerprint in plays:
+                before = instrumentation.stages.snapshot()
+
+                # Loads the play into a new object
+                p = play.Play(path, streaming=True)
+
+                # Avoids processing not found plays
+                if p.speech_amount > 0:
+                    speeches = p.getSpeeches()
+                    playCheckpoint, done = self.restore(path, fingerprint, speeches)
+                    chunks = self.submit(pool, speeches[done:])
+                    pending.append((path, fingerprint, p, playCheckpoint, chunks))
+
+                    self.measure(path, p, instrumentation.stages.since(before))
+
+                # Exports the oldest play once enough are on their way
+                while len(pending) > self.lookahead:
+                    self.collect(*pending.popleft(), plots, pool)
+
+            while pending:
+                self.collect(*pending.popleft(), plots, pool)
+
+            # Waits for the last plots
+            self.collectPlots(wait=True)
+
+    def submit(self, pool, speeches):
+        """ Sends speeches of a play to the workers.
+        Args:
+            pool (ProcessPoolExecutor): The pool of workers.
+            speeches (list): The speeches to process.
+        Returns: list
+            A list of (speeches, future) for each chunk of speeches.
+        """
+
+        chunks = []
+
+        for start in range(0, len(speeches), self.chunk_size):
+            chunk = speeches[start:start + self.chunk_size]
+            chunks.append((chunk, pool.submit(scoreSpeeches, chunk)))
+
+        return chunks
+
+    def collect(self, path, fingerprint, p, playCheckpoint, chunks, plots=True, pool=None):
+        """ Waits for the speeches of a play and exports it.
+        Args:
+            path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of this run.
+            p (Play): The play.
+            playCheckpoint (Checkpoint): The checkpoint of the play, if any.
+            chunks (list): The chunks returned by submit.
+            plots (bool): Generates and saves the plots of the play.
+            pool (ProcessPoolExecutor): The pool drawing the plots, if any.
+        Returns:
+            None
+        """
+
+        for chunk, future in chunks:
+            states, counters, stages = future.result()
+            self.measure(path, p, stages, worker=True)
+
+            # Copies the results back into the speeches of the play
+            for s, state in zip(chunk, states):
+                s.__setstate__(state)
+
+            if playCheckpoint:
+                playCheckpoint.append(states)
+
+            self.counters.update(counters)
+
+        print(f'# Successfully extracted emotions for play "{p.title}"')
+
+        before = instrumentation.stages.snapshot()
+        self.finish(path, fingerprint, p, playCheckpoint, plots, pool)
+        self.measure(path, p, instrumentation.stages.since(before))
+
+        # Records the plays whose plots are already saved
+        self.collectPlots()
+
+    def finish(self, path, fingerprint, p, playCheckpoint, plots=True, pool=None):
+        """ Exports a processed play, saves its plots, records it
+            in the manifest and removes its checkpoint.
+
+            With a pool, the plots are drawn by the workers, and
+            the play is recorded once they are saved (see collectPlots).
+        Args:
+            path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of this run.
+            p (Play): The play.
+            playCheckpoint (Checkpoint): The checkpoint of the play, if any.
+            plots (bool): Generates and saves the plots of the play.
+            pool (ProcessPoolExecutor): The pool drawing the plots, if any.
+        Returns:
+            None
+        """
+
+        # Exports the data to CSV, for later reuse, with its summary
+        artifacts = [p.to_csv(), p.to_summary()]
+        self.summaries[path] = artifacts[1]
+
+        if playCheckpoint:
+            playCheckpoint.reset()
+
+        if not plots:
+            self.record(path, fingerprint, artifacts)
+            return
+
+        frames = vizualisation.Vizualisation.framesOf(p)
+
+        if pool:
+            self.rendering.append((path, fingerprint, artifacts, pool.submit(renderPlots, p.title, frames)))
+        else:
+            names, seconds, _ = renderPlots(p.title, frames)
+            self.countPlots(names, seconds)
+            self.record(path, fingerprint, artifacts + names)
+
+    def compare(self):
+        """ Saves the graphics comparing the plays of the corpus (see
+            CorpusVizualisation), from the summaries of the plays
+            exported by this run or a previous one.
+        Returns:
+            None
+        """
+
+        paths = [self.summaries[path] for path in self.paths if self.summaries.get(path)]
+
+        if not paths:
+            return
+
+        start = time.time()
+
+        summary = corpusvizualisation.CorpusVizualisation.loadSummaries(paths)
+        names = corpusvizualisation.CorpusVizualisation.saveAll("Corpus", summary)
+
+        self.countPlots(names, time.time() - start)
+
+    def collectPlots(self, wait=False):
+        """ Records the plays whose plots were saved by the workers,
+            in the order of the plays.
+        Args:
+            wait (bool): Waits for the plots of every play.
+        Returns:
+            None
+        """
+
+        while self.rendering and (wait or self.rendering[0][3].done()):
+            path, fingerprint, artifacts, future = self.rendering.popleft()
+
+            names, seconds, stages = future.result()
+            self.countPlots(names, seconds)
+            self.measure(path, None, stages, worker=True)
+            self.record(path, fingerprint, artifacts + names)
+
+    def measure(self, path, p, stages, worker=False):
+        """ Adds the time spent in each stage for a play.
+        Args:
+            path (str): Path to the xml file of the play.
+            p (Play): The play, None if already measured.
+            stages (Instrumentation): The measures.
+            worker (bool): If the measures were taken by a worker.
+        Returns:
+            None
+        """
+
+        if p is not None:
+            self.titles[path] = p.title
+
+        self.play_stages.setdefault(path, instrumentation.Instrumentation()).update(stages)
+
+        if worker:
+            self.worker_stages.update(stages)
+
+    def writeReport(self, seconds):
+        """ Writes the JSON report of the last run: the time spent
+            in each stage, for the whole run and for each play,
+            with the counters of the run.
+        Args:
+            seconds (float): Wall time of the run.
+        Returns:
+            None
+        """
+
+        report = {
+            'seconds':round(seconds, 3),
+            'workers':self.workers,
+            'wsd':self.wsd_strategy,
+            'counters':dict(self.counters),
+            'stages':self.stages.report(),
+            'plays':{
+                path:{'title':self.titles.get(path), 'stages':stages.report()}
+                for path, stages in self.play_stages.items()
+            }
+        }
+
+        directory = os.path.dirname(self.report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.report_path, 'w', encoding='utf-8') as reportFile:
+            json.dump(report, reportFile, indent=1)
+
+        print(f'# Report saved to "{self.report_path}".')
+
+    def countPlots(self, names, seconds):
+        """ Counts saved plots and the time spent drawing them. """
+
+        self.counters['plots'] += len(names)
+        self.counters['plot_seconds'] += seconds
+
+    def record(self, path, fingerprint, artifacts):
+        """ Records an exported play in the manifest.
+        Args:
+            path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of this run.
+            artifacts (list): The paths of the files produced for the play.
+        Returns:
+            None
+        """
+
+        # Plays whose CSV could not be written are processed again
+        if self.manifest and fingerprint and None not in artifacts:
+            self.manifest.record(path, fingerprint, artifacts)
@@ -0,0 +1,198 @@
+"""
+    Module CorpusVizualisation
+"""
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+# Custom classes
+import instrumentation
+import play
+import vizualisation
+
+class CorpusVizualisation(vizualisation.Vizualisation):
+    """
+        CorpusVizualisation class.
+
+        It is used to compare the plays of a corpus. It only reads
+        the summary tables written when the plays are exported
+        (see Play.summaryFrame), so no play nor speech is loaded.
+
+        Graphics are drawn and saved as those of a play (see
+        Vizualisation).
+    """
+
+    vtypes = ["eau", "eth"]
+
+    # Names of the saved graphics, by vizualisation type
+    names = {
+        "eau":"Emotions by author",
+        "eth":"Emotion trajectories"
+    }
+
+    # Amount of emotions displayed
+    top = 8
+
+    # Amount of parts plays are divided into (see emotionTrajectories)
+    parts = 10
+
+    def __init__(self, summary, vtype, title="Corpus"):
+        """
+            Constructor of the CorpusVizualisation class.
+        Args:
+            summary: The summaries of the plays (see loadSummaries). (dataframe)
+            vtype: The type of vizualisation to display. (str)
+            title: The name of the corpus, used in file names. (str)
+        """
+        if vtype not in self.vtypes:
+            print('# This vizualisation does not exist.')
+            print(f"# Please choose between {', '.join(self.vtypes)}")
+            return
+
+        self.play = None
+        self.vtype = vtype
+        self.title = title
+        self.data = summary
+
+    @staticmethod
+    @instrumentation.timed('load')
+    def loadSummaries(paths):
+        """ Reads the summary tables of several plays into one.
+        Args:
+            paths: Paths to the summary files (see Play.to_summary). (list)
+        Returns: dataframe
+            The rows of every summary, files which cannot be read
+            being skipped.
+        Examples:
+            >>> summary = CorpusVizualisation.loadSummaries(glob.glob("* - Summary.csv"))
+            >>> CorpusVizualisation(summary, "eau").plot()
+        """
+
+        frames = []
+
+        for path in paths:
+            try:
+                frame = pd.read_csv(path)
+            except (IOError, pd.errors.ParserError):
+                print(f'# The summary "{path}" could not be loaded, skipping it.')
+                continue
+
+            # Summaries written by older versions only have scene numbers
+            if 'division' not in frame:
+                frame.insert(frame.columns.get_loc('scene'), 'division', frame.scene)
+
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=play.Play.summary_columns)
+
+        return pd.concat(frames, ignore_index=True)
+
+    @instrumentation.timed('plot')
+    def plot(self, save=False):
+        """
+            Calls the right method depending on the vizualisation type,
+            and optionnally saves the graphic inside the same directory.
+        Args:
+            save: If the graphic must be saved. (bool)
+        Returns: None
+        Examples:
+            >>> viz = CorpusVizualisation(summary, "eth")
+            >>> viz.plot()
+            >>> viz.plot(save=True)
+
+        """
+        if self.vtype == "eau":
+            self.emotionsByAuthor(save)
+        elif self.vtype == "eth":
+            self.emotionTrajectories(save)
+        else:
+            print("# No plot found!")
+
+    def emotionsByAuthor(self, save=False):
+        """ Displays the share of the most frequent emotions among
+            the emotions of each author.
+        Args:
+            save: If the graphic must be saved. (bool)
+        Returns: None
+        Examples:
+            >>> viz = CorpusVizualisation(summary, "eau")
+            >>> viz.emotionsByAuthor(save=True)
+        """
+
+        df = self.frames()
+        df = df[df.emotion.notna()]
+
+        # Emotion counts of each author (one row per author)
+        counts = df.groupby(['author', 'emotion'])['count'].sum().unstack(fill_value=0)
+        shares = self.topShares(counts)
+
+        # Renders plot
+        fig, ax = self.newFigure((12, max(6, 0.4 * len(shares))), save)
+
+        # Corpora without emotions get empty axes
+        if not shares.empty:
+            sns.heatmap(shares, annot=True, fmt='.0%', cmap='rocket_r', ax=ax)
+        ax.set(xlabel='Emotion', ylabel='Author')
+        ax.set_title('Share of the most frequent emotions, by author')
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.subplots_adjust(left=0.3, bottom=0.2)
+
+        self.output(fig, save)
+
+    def emotionTrajectories(self, save=False):
+        """ Displays how often the most frequent emotions appear
+            along the plays, each play being divided into parts
+            of equal amount of divisions (scenes, or acts), in
+            reading order (see Play.summaryFrame).
+        Args:
+            save: If the graphic must be saved. (bool)
+        Returns: None
+        Examples:
+            >>> viz = CorpusVizualisation(summary, "eth")
+            >>> viz.emotionTrajectories(save=True)
+        """
+
+        df = self.frames()
+
+        # Part of the play of the middle of each division, from 0 to parts - 1
+        first = df.groupby('title').division.transform('min')
+        span = df.groupby('title').division.transform('max') - first + 1
+        df = df.assign(position=(2 * (df.division - first) + 1) * self.parts // (2 * span))
+        df = df[df.emotion.notna()]
+
+        # Emotion counts of each part (one column per part)
+        counts = (
+            df.groupby(['emotion', 'position'])['count'].sum()
+            .unstack(fill_value=0)
+            .reindex(columns=range(self.parts), fill_value=0)
+        )
+        shares = self.topShares(counts.T).T
+        shares.columns = [f'{100 * i // self.parts}%' for i in shares.columns]
+
+        # Renders plot
+        fig, ax = self.newFigure((12, 6), save)
+
+        # Parts without any division are left blank
+        if not shares.empty:
+            sns.heatmap(shares, cmap='rocket_r', ax=ax)
+        ax.set(xlabel='Position in the play', ylabel='Emotion')
+        ax.set_title('Share of the most frequent emotions along the plays')
+
+        self.output(fig, save)
+
+    def topShares(self, counts):
+        """ Keeps the most frequent emotions of a table of counts,
+            as shares of all the emotions of each row.
+        Args:
+            counts: Emotion counts, one column per emotion. (dataframe)
+        Returns: dataframe
+            The shares of the top emotions, the most frequent first
+            (NaN for rows without emotions).
+        """
+
+        kept = counts.sum().sort_values(ascending=False, kind='stable').index[:self.top]
+        totals = counts.sum(axis=1).replace(0, np.nan)
+
+        return counts[kept].div(totals, axis=0)
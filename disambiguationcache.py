@@ -0,0 +1,189 @@
+"""
+    Module DisambiguationCache
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+class DisambiguationCache:
+    """
+        DisambiguationCache class.
+
+        It is used to store the output of pywsd on disk, so that
+        a line which has already been disambiguated (in this run
+        or in a previous one) does not need to be disambiguated
+        again.
+
+        Entries are keyed by a hash of the normalized text, the
+        algorithm and the similarity option, and store the pywsd
+        output with synsets replaced by their names. The cache is
+        an SQLite database which can be shared by several processes.
+        When it holds more than max_entries lines, the least
+        recently used ones are evicted.
+
+        Lookups only read the database: the lines they find are
+        remembered, and marked as recently used in a single write
+        with the next put, flush or close, so that processes sharing
+        the database do not wait on each other for every hit.
+    """
+
+    def __init__(self, path="cache/disambiguation.sqlite", max_entries=500000):
+        """ Constructor.
+        Args:
+            path (str): Path to the SQLite database (created if needed).
+            max_entries (int): Maximal amount of cached lines.
+        """
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.touched = {} # Key -> time of the last hit, not written yet
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Waits for other processes instead of failing when locked
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS disambiguation (
+                    key TEXT PRIMARY KEY,
+                    output TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )''')
+            self.connection.execute('''
+                CREATE INDEX IF NOT EXISTS disambiguation_last_used
+                ON disambiguation (last_used)''')
+
+        # Amount of entries, kept up to date by put()
+        self.size = self.connection.execute('SELECT COUNT(*) FROM disambiguation').fetchone()[0]
+
+    @staticmethod
+    def makeKey(text, algorithm, similarity_option):
+        """ Returns the key of a line for an algorithm and a similarity option.
+        Args:
+            text (str): The line to disambiguate.
+            algorithm (str): The name of the algorithm.
+            similarity_option (str): The similarity option.
+        Returns:
+            str: The key of the line.
+        Examples:
+            >>> DisambiguationCache.makeKey('I went to the bank', 'max_similarity', 'wup')
+            '5d1c0cf3d9e7...'
+        """
+
+        # Whitespace does not change the output of pywsd
+        text = re.sub(r'\s+', ' ', str(text)).strip()
+
+        return hashlib.sha1('\0'.join([text, algorithm, str(similarity_option)]).encode('utf-8')).hexdigest()
+
+    def get(self, text, algorithm, similarity_option):
+        """ Returns the cached pywsd output of a line, if any.
+        Args:
+            text (str): The line to disambiguate.
+            algorithm (str): The name of the algorithm.
+            similarity_option (str): The similarity option.
+        Returns:
+            list: A list of (word, lemma, synset name) tuples, or None.
+        """
+
+        key = self.makeKey(text, algorithm, similarity_option)
+
+        # A plain read, which does not take the write lock
+        row = self.connection.execute(
+            'SELECT output FROM disambiguation WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        # Marks the line as recently used (see flush)
+        self.touched[key] = time.time()
+        self.hits += 1
+
+        return [tuple(item) for item in json.loads(row[0])]
+
+    def put(self, text, algorithm, similarity_option, output):
+        """ Stores the pywsd output of a line.
+        Args:
+            text (str): The disambiguated line.
+            algorithm (str): The name of the algorithm.
+            similarity_option (str): The similarity option.
+            output (list): A list of (word, lemma, synset name) tuples.
+        Returns:
+            None
+        """
+
+        key = self.makeKey(text, algorithm, similarity_option)
+
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO disambiguation VALUES (?, ?, ?)',
+                (key, json.dumps(output), time.time()))
+            self.size += cursor.rowcount
+            self.writeTouched()
+
+        if self.size > self.max_entries:
+            self.evict()
+
+    def flush(self):
+        """ Marks the lines found since the last write as recently used.
+        Returns:
+            None
+        """
+
+        if self.touched:
+            with self.connection:
+                self.writeTouched()
+
+    def writeTouched(self):
+        """ Writes the time of the last hit of the lines found since
+            the last write, inside the current transaction.
+        """
+
+        self.connection.executemany(
+            'UPDATE disambiguation SET last_used = ? WHERE key = ?',
+            [(last_used, key) for key, last_used in self.touched.items()])
+        self.touched = {}
+
+    def evict(self):
+        """ Removes the least recently used lines, down to 90% of max_entries.
+        Returns:
+            None
+        """
+
+        with self.connection:
+            # Other processes may have added or removed lines
+            self.size = self.connection.execute('SELECT COUNT(*) FROM disambiguation').fetchone()[0]
+            excess = self.size - int(self.max_entries * 0.9)
+
+            if self.size > self.max_entries and excess > 0:
+                self.connection.execute('''
+                    DELETE FROM disambiguation WHERE key IN (
+                        SELECT key FROM disambiguation ORDER BY last_used LIMIT ?
+                    )''', (excess,))
+                self.size -= excess
+
+    @property
+    def hitRate(self):
+        """ Returns the share of lookups found in the cache (between 0 and 1). """
+
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def close(self):
+        """ Marks the lines found as recently used, then closes the database. """
+        self.flush()
+        self.connection.close()
+
+    def __str__(self):
+        """ Returns the counters of the cache when printed. """
+        return f'Disambiguation cache: {self.hits} hit(s), {self.misses} miss(es) ({round(100 * self.hitRate, 1)}% hits), {self.size} line(s)'
@@ -0,0 +1,272 @@
+"""
+    Module Disambiguator
+"""
+
+import nltk
+
+from pywsd import allwords_wsd, lesk, similarity, utils
+
+class Disambiguator:
+    """
+        Disambiguator class.
+
+        It disambiguates lines with one of the following strategies,
+        from the slowest to the fastest:
+
+            - max_similarity: the synset most similar to the context
+              (wup similarity), as pywsd.disambiguate(text,
+              algorithm=max_similarity, similarity_option='wup',
+              keepLemmas=True) does
+            - simple_lesk: the synset whose definition and examples
+              overlap the most with the context, as
+              pywsd.disambiguate(text, algorithm=simple_lesk,
+              keepLemmas=True) does
+            - first_sense: the first synset of the word in WordNet
+              (its most frequent sense), without context
+            - none: no disambiguation at all
+
+        What pywsd computes again at each call is shared by all the
+        lines it processes (e.g. all the speeches of a play):
+
+            - the part-of-speech tagger, loaded once instead of
+              at each call of nltk.pos_tag
+            - the lemma of each word, the WordNet synsets and the
+              Lesk signatures of each lemma
+            - for each candidate synset and word of the context,
+              the best similarity between the synset and the
+              synsets of the word
+
+        Similarity scores are forgotten beyond memo_size scores.
+    """
+
+    strategies = ['max_similarity', 'simple_lesk', 'first_sense', 'none']
+
+    def __init__(self, strategy='max_similarity', similarity_option='wup', memo_size=500000):
+        """ Constructor.
+        Args:
+            strategy (str): The disambiguation strategy (see strategies).
+            similarity_option (str): The similarity option of max_similarity.
+            memo_size (int): Maximal amount of remembered similarity scores.
+        """
+
+        if strategy not in self.strategies:
+            print(f'# The disambiguation strategy "{strategy}" does not exist, using max_similarity.')
+            print(f"# Please choose between {', '.join(self.strategies)}")
+            strategy = 'max_similarity'
+
+        self.strategy = strategy
+
+        # Only max_similarity has a similarity option (see DisambiguationCache.makeKey)
+        self.similarity_option = similarity_option if strategy == 'max_similarity' else None
+
+        self.memo_size = memo_size
+        self.tagger = None # Loaded on first use
+        self.clearMemo()
+
+    def clearMemo(self):
+        """ Forgets the lemmas, synsets and similarity scores
+            remembered so far and resets the counters.
+        """
+
+        self.lemmas = {} # (word, pos) -> lemma
+        self.synsets = {} # (lemma, pos) -> synsets
+        self.signatures = {} # (lemma, pos) -> Lesk signature of each synset
+        self.scores = {} # (synset, context word) -> best similarity
+        self.score_hits = 0
+        self.score_misses = 0
+
+    def disambiguate(self, text):
+        """ Disambiguates a line with the strategy of the disambiguator.
+        Args:
+            text (str): The line to disambiguate.
+        Returns: list
+            A list of (word, lemma, synset) tuples, synset being
+            None for stopwords, punctuation and words missing from
+            WordNet (same output as pywsd.disambiguate). Without
+            disambiguation, words are only lowercased.
+        Examples:
+            >>> Disambiguator().disambiguate('I went to the bank')
+            [('I', 'i', None), ('went', 'go', Synset('go.v.01')), ...]
+            >>> Disambiguator('none').disambiguate('I went to the bank')
+            [('I', 'i', None), ('went', 'went', None), ...]
+        """
+
+        if self.strategy == 'none':
+            return [(word, word.lower(), None) for word in allwords_wsd.word_tokenize(text)]
+
+        # Lemmatizes the line (see pywsd.utils.lemmatize_sentence)
+        words = []
+        lemmas = []
+        poss = []
+
+        for word, pos in self.tag(allwords_wsd.word_tokenize(text)):
+            morphy_pos = utils.penn2morphy(pos)
+            lemmas.append(self.lemmaOf(word.lower(), morphy_pos))
+            poss.append(morphy_pos or None)
+            words.append(word)
+
+        context = None
+        output = []
+
+        # Only disambiguates content words found in WordNet
+        for word, lemma, pos in zip(words, lemmas, poss):
+            synset = None
+
+            if lemma not in allwords_wsd.stopwords and self.synsetsOf(lemma):
+                if self.strategy == 'first_sense':
+                    synset = self.firstSense(lemma, pos)
+
+                elif self.strategy == 'simple_lesk':
+                    # Context of the line, already lemmatized
+                    if context is None:
+                        context = " ".join(lemmas).split()
+
+                    synset = self.simpleLesk(context, lemma, pos)
+
+                else:
+                    # Context of the line, lemmatized word by word
+                    if context is None:
+                        context = [self.lemmaOf(w) for w in allwords_wsd.word_tokenize(" ".join(lemmas))]
+
+                    synset = self.maxSimilarity(context, lemma, pos)
+
+            output.append((word, lemma, synset))
+
+        return output
+
+    def maxSimilarity(self, context, ambiguous_word, pos=None):
+        """ Finds the synset of a word which is the most similar to
+            its context (see pywsd.similarity.max_similarity).
+        Args:
+            context (list): The lemmatized words of the line.
+            ambiguous_word (str): The word to disambiguate.
+            pos (str): The part of speech of the word, if known.
+        Returns: Synset
+            The best synset, or None if the word is not in WordNet
+            (or has no synset for its part of speech).
+        """
+
+        ambiguous_word = self.lemmaOf(ambiguous_word)
+
+        if not self.synsetsOf(ambiguous_word):
+            return None
+
+        result = {}
+        for synset in self.synsetsOf(ambiguous_word, pos):
+            total = 0.0
+            for word in context:
+                total += self.scoreOf(synset, word)
+            result[synset] = total
+
+        # Resnik scores are better when lower
+        reverse = self.similarity_option.lower() not in ("res", "resnik")
+        ranked = sorted(((v, k) for k, v in result.items()), key=lambda x: x[0], reverse=reverse)
+
+        # pywsd fails when the word has no synset for its part of speech
+        return ranked[0][1] if ranked else None
+
+    def simpleLesk(self, context, ambiguous_word, pos=None):
+        """ Finds the synset of a word whose signature overlaps the
+            most with its context (see pywsd.lesk.simple_lesk).
+        Args:
+            context (list): The lemmas of the line.
+            ambiguous_word (str): The word to disambiguate.
+            pos (str): The part of speech of the word, if known.
+        Returns: Synset
+            The best synset, or None if the word is not in WordNet.
+        """
+
+        ambiguous_word = self.lemmaOf(ambiguous_word, pos)
+
+        if not self.synsetsOf(ambiguous_word):
+            return None
+
+        key = (ambiguous_word, pos)
+        if key not in self.signatures:
+            self.signatures[key] = lesk.simple_signatures(ambiguous_word, pos)
+
+        if not self.signatures[key]:
+            return None
+
+        return lesk.compare_overlaps(context, self.signatures[key])
+
+    def firstSense(self, lemma, pos=None):
+        """ Returns the first synset of a lemma, for its part of
+            speech if it has any (see pywsd.baseline.first_sense).
+        """
+
+        synsets = self.synsetsOf(lemma, pos) or self.synsetsOf(lemma)
+
+        return synsets[0] if synsets else None
+
+    def scoreOf(self, synset, word):
+        """ Returns the best similarity between a synset and the
+            synsets of a word (0 if there is none), computed once.
+        """
+
+        key = (synset, word)
+
+        try:
+            score = self.scores[key]
+            self.score_hits += 1
+
+        except KeyError:
+            self.score_misses += 1
+
+            scores = [0.0]
+            for other in self.synsetsOf(word):
+                scores.append(similarity.sim(synset, other, self.similarity_option))
+            score = max(scores)
+
+            if len(self.scores) >= self.memo_size:
+                self.scores.clear()
+            self.scores[key] = score
+
+        return score
+
+    def lemmaOf(self, word, pos=None):
+        """ Returns the lemma of a word (see pywsd.utils.lemmatize),
+            computed once for each word and part of speech.
+        """
+
+        key = (word, pos or None)
+
+        try:
+            return self.lemmas[key]
+
+        except KeyError:
+            # Tags the word alone when its part of speech is unknown
+            if not pos:
+                pos = utils.penn2morphy(self.tag([word])[0][1], default_to_noun=True)
+
+            lemma = self.lemmas[key] = utils.lemmatize(word, pos)
+            return lemma
+
+    def synsetsOf(self, lemma, pos=None):
+        """ Returns the WordNet synsets of a lemma, looked up once. """
+
+        key = (lemma, pos)
+
+        try:
+            return self.synsets[key]
+
+        except KeyError:
+            synsets = self.synsets[key] = allwords_wsd.wn.synsets(lemma, pos=pos)
+            return synsets
+
+    def tag(self, tokens):
+        """ Tags the parts of speech of tokens, as nltk.pos_tag does,
+            with a tagger loaded once.
+        """
+
+        if self.tagger is None:
+            self.tagger = nltk.tag.PerceptronTagger()
+
+        return self.tagger.tag(tokens)
+
+    @property
+    def hitRate(self):
+        """ Returns the share of similarity scores found in the memo (between 0 and 1). """
+
+        lookups = self.score_hits + self.score_misses
+        return self.score_hits / lookups if lookups else 0
@@ -0,0 +1,115 @@
+"""
+    Module emotions
+
+    Vocabulary of the emotions found in senticnet. Emotions are
+    handled internally as small integer codes (for counting and
+    storage), and converted back to names at export and plot time.
+    Code 0 stands for no emotion (None).
+"""
+
+# Labels of the Hourglass of Emotions (senticnet 6), by dimension,
+# followed by the mood tags of senticnet 5
+names = [
+    None,
+    # Introspection
+    'ecstasy', 'joy', 'contentment', 'melancholy', 'sadness', 'grief',
+    # Temper
+    'bliss', 'calmness', 'serenity', 'annoyance', 'anger', 'rage',
+    # Attitude
+    'delight', 'pleasantness', 'acceptance', 'dislike', 'disgust', 'loathing',
+    # Sensitivity
+    'enthusiasm', 'eagerness', 'responsiveness', 'anxiety', 'fear', 'terror',
+    # Senticnet 5
+    'interest', 'admiration', 'surprise',
+]
+
+# Name -> code, also holding senticnet labels ('#joy') once normalized
+codes = {name:code for code, name in enumerate(names)}
+
+def codeOf(emotion):
+    """ Returns the code of an emotion.
+
+        Names and senticnet labels ('joy' or '#joy') are both
+        accepted. Anything which is not a name (None, empty string,
+        NaN read from a CSV) is no emotion. Names missing from the
+        vocabulary are added to it, so that no emotion is lost.
+
+    Args:
+        emotion (str): Name or label of the emotion.
+    Returns: int
+        The code of the emotion, 0 for no emotion.
+    Examples:
+        >>> emotions.codeOf('#joy')
+        2
+        >>> emotions.codeOf(None)
+        0
+    """
+
+    try:
+        return codes[emotion]
+
+    except (KeyError, TypeError):
+        if not isinstance(emotion, str) or not emotion.strip('#'):
+            return 0
+
+    code = codes.get(emotion.replace('#', ''))
+    if code is None:
+        code = len(names)
+        names.append(emotion.replace('#', ''))
+        codes[names[code]] = code
+
+    codes[emotion] = code
+    return code
+
+def nameOf(code):
+    """ Returns the name of an emotion code (None for code 0). """
+    return names[code]
+
+def modeOf(counts):
+    """ Finds the most frequent emotion, unless it is tied.
+    Args:
+        counts (dict): Count of each emotion code.
+    Returns: int
+        The most frequent code, 0 if there is none or if several
+        codes are the most frequent. No emotion (0) is not counted.
+    Examples:
+        >>> emotions.modeOf({2:3, 5:1})
+        2
+        >>> emotions.modeOf({2:3, 5:3})
+        0
+    """
+
+    best_code = 0
+    best = second = 0
+
+    for code, count in counts.items():
+        if not code:
+            continue
+        if count > best:
+            best_code, best, second = code, count, best
+        elif count > second:
+            second = count
+
+    return best_code if best > second else 0
+
+def maxOf(counts):
+    """ Finds the most frequent emotion, the first counted one
+        winning ties.
+    Args:
+        counts (dict): Count of each emotion code, in order.
+    Returns: int
+        The most frequent code, 0 if there is none. No emotion (0)
+        is not counted.
+    Examples:
+        >>> emotions.maxOf({2:3, 5:3})
+        2
+    """
+
+    best_code = 0
+    best = 0
+
+    for code, count in counts.items():
+        if code and count > best:
+            best_code, best = code, count
+
+    return best_code
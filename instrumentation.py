@@ -0,0 +1,209 @@
+"""
+    Module Instrumentation
+"""
+
+import collections
+import contextlib
+import cProfile
+import functools
+import io
+import pstats
+import time
+
+class Instrumentation:
+    """
+        Instrumentation class.
+
+        It measures the time spent in each stage of the pipeline
+        (XML parsing, disambiguation, senticnet lookups, export,
+        plots, ...) and how many times each stage ran.
+
+        Stages are timed with a context manager (timer) or a
+        decorator (timed), around batches of work rather than small
+        functions called for every token, whose timing would cost
+        more than their work. A stage running inside itself is only
+        timed once, by its outermost call. Different stages can nest:
+        the time of a stage includes the stages it runs, so the stages
+        which may run others (e.g. tokenize, which may disambiguate)
+        only time their own work.
+
+        The module keeps one instance, stages, used by the whole
+        pipeline (stages.enabled = False turns it off). Instances
+        can be subtracted (since) and added (update), so that the
+        stages of a play, or of a worker process, can be isolated
+        and gathered.
+    """
+
+    def __init__(self):
+        """ Constructor. """
+
+        self.enabled = True
+        self.active = set() # Stages being timed
+        self.reset()
+
+    def reset(self):
+        """ Forgets every measure. """
+
+        self.seconds = collections.Counter()
+        self.calls = collections.Counter()
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """ Times the code of a with block as a stage.
+        Args:
+            stage (str): The name of the stage.
+        Examples:
+            >>> with instrumentation.stages.timer('parse'):
+            ...     records = list(play.parseStream())
+        """
+
+        if not self.enabled or stage in self.active:
+            yield
+            return
+
+        self.active.add(stage)
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.stop(stage, start)
+
+    def stop(self, stage, start):
+        """ Ends the timing of a stage started at start (perf_counter). """
+
+        self.seconds[stage] += time.perf_counter() - start
+        self.calls[stage] += 1
+        self.active.discard(stage)
+
+    def count(self, stage, amount=1):
+        """ Counts items processed by a stage (e.g. tokens), without timing. """
+
+        if self.enabled:
+            self.calls[stage] += amount
+
+    def snapshot(self):
+        """ Returns a copy of the current measures. """
+
+        copy = Instrumentation()
+        copy.update(self)
+        return copy
+
+    def since(self, before):
+        """ Returns the measures taken since a snapshot.
+        Args:
+            before (Instrumentation): The snapshot.
+        Returns: Instrumentation
+            The difference.
+        Examples:
+            >>> before = instrumentation.stages.snapshot()
+            >>> p = play.Play('path/to/file.xml')
+            >>> instrumentation.stages.since(before).report()
+            {'parse': {'seconds': 0.412, 'calls': 1}, ...}
+        """
+
+        delta = Instrumentation()
+        delta.seconds = collections.Counter({
+            stage:seconds - before.seconds[stage] for stage, seconds in self.seconds.items()
+        })
+        delta.calls = collections.Counter({
+            stage:calls - before.calls[stage] for stage, calls in self.calls.items()
+        })
+
+        return delta
+
+    def update(self, other):
+        """ Adds the measures of another instance (e.g. of a worker) to these. """
+
+        self.seconds.update(other.seconds)
+        self.calls.update(other.calls)
+
+    def report(self):
+        """ Returns the measures as plain data, for JSON.
+        Returns: dict
+            For each stage, the seconds spent and the amount of
+            calls (or items), the longest stages first.
+        """
+
+        stages = sorted(self.calls, key=lambda stage: (-self.seconds[stage], stage))
+
+        return {
+            stage:{'seconds':round(self.seconds[stage], 4), 'calls':self.calls[stage]}
+            for stage in stages if self.calls[stage] or self.seconds[stage]
+        }
+
+    def __getstate__(self):
+        """ Sends the measures only (not the stages being timed) to other processes. """
+
+        return {'enabled':self.enabled, 'seconds':self.seconds, 'calls':self.calls}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.active = set()
+
+# Measures of the pipeline
+stages = Instrumentation()
+
+def timer(stage):
+    """ Times a with block as a stage of the pipeline (see Instrumentation.timer). """
+
+    return stages.timer(stage)
+
+def timed(stage):
+    """ Decorator timing each call of a function as a stage of the pipeline.
+    Args:
+        stage (str): The name of the stage.
+    Examples:
+        >>> @instrumentation.timed('export')
+        ... def to_csv(self, path=None):
+        ...     ...
+    """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # Same as stages.timer, inlined as it wraps small functions
+            if not stages.enabled or stage in stages.active:
+                return function(*args, **kwargs)
+
+            stages.active.add(stage)
+            start = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+
+            finally:
+                stages.stop(stage, start)
+
+        return wrapper
+
+    return decorate
+
+@contextlib.contextmanager
+def profile(path, top=20):
+    """ Profiles a with block with cProfile, dumps the statistics
+        (pstats format) and prints the slowest functions.
+    Args:
+        path (str): Path of the statistics file.
+        top (int): Amount of functions printed.
+    Examples:
+        >>> with instrumentation.profile('hamlet.pstats'):
+        ...     corpus.Corpus(['theater/hamlet.xml']).run()
+        >>> pstats.Stats('hamlet.pstats').sort_stats('cumulative').print_stats(20)
+    """
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    try:
+        yield profiler
+
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(top)
+        print(output.getvalue())
+        print(f'# Profile saved to "{path}" (see pstats).')
@@ -2,14 +2,16 @@
     General pipeline for EmoPlay
 """
 
+import argparse
 import glob
+import os
 
 # Custom classes
-import play
-import senticnet
-import vizualisation
+import corpus
+import disambiguator
 
-def main():
+def main(workers=1, cache_path="cache/disambiguation.sqlite", resume=True, wsd_strategy="max_similarity",
+         report_path="cache/report.json", profile=None):
     """ Main function of EmoPlay.
 
     pipeline:
@@ -28,53 +30,75 @@ def main():
         (6) Exports the data to CSV, for later reuse
 
         (7) If needed, reimports everything from the csv
-    """
-
-    # (1) Loads senticnet [mandatory for emotions' search]
-    stcnet = senticnet.Senticnet()
+            (see Play.from_csv)
 
-    # (2) Finds all xml files
-    plays = glob.glob("theater/*.xml")
+        (8) Generates and saves plots
 
-    # (3) Makes the whole process for each xml file [takes a long time]
-    for path in plays:
+        (9) Compares the plays of the corpus, from a summary
+            table of each play written at step (6)
+            (see CorpusVizualisation)
 
-        # (4) Loads the play into a new object
-        p = play.Play(path)
+    Steps (1) and (3) to (9) are made by corpus.Corpus. With more
+    than one worker, the speeches are processed by a pool of
+    processes, each of them loading senticnet once.
 
-        # Avoids processing not found plays
-        if p.speech_amount > 0:
-            # (5) Loops through each speech of each character to get
-            # the emotions for each speech of the play
-            for character in p.characters:
-                for speech in character.speeches:
-                    # Compute overall emotions of each speech
-                    speech.getEmotions(stcnet)
+    Lines already disambiguated (in this run or a previous one)
+    are read from the disambiguation cache instead.
 
-            # (6) Exports the data to CSV, for later reuse
-            p.to_csv()
+    Plays already exported by a previous run (same xml file,
+    senticnet and settings) are skipped, and a play interrupted
+    by a crash resumes from its last checkpoint.
 
-            # (7) If needed, reimports everything from the csv
-            #path_csv = "path/to/csv"
-            #p.from_csv(path_csv)
+    Disambiguation uses max_similarity by default, the most
+    accurate and slowest strategy (see Disambiguator).
 
-            # (8) Generates and saves plots
+    The time spent in each stage (parsing, disambiguation,
+    senticnet lookups, export, plots, ...) is written to a JSON
+    report, for the whole run and for each play. A single play
+    can also be profiled with cProfile instead.
 
-            # Bar plot for speeches
-            barPlotSpeeches = vizualisation.Vizualisation(p, "bps")
-            barPlotSpeeches.plot(True)
+    Args:
+        workers (int): Amount of worker processes (1 is serial)
+        cache_path (str): Path to the disambiguation cache (None to disable it)
+        resume (bool): Skips up to date plays and resumes interrupted ones
+        wsd_strategy (str): Disambiguation strategy
+        report_path (str): Path to the JSON report (None to disable it)
+        profile (str): Path to the xml file of a play to profile,
+            alone and serially (saved to "<file name>.pstats")
+    """
 
-            # Bar plot for words
-            barPlotWords = vizualisation.Vizualisation(p, "bpw")
-            barPlotWords.plot(True)
+    # (2) Finds all xml files
+    plays = glob.glob("theater/*.xml")
+    profile_path = None
 
-            # Emotions by character
-            emotionByCharacter = vizualisation.Vizualisation(p, "ebc")
-            emotionByCharacter.plot(True)
+    # Profiles a single play, processed again in this process
+    if profile:
+        plays = [profile]
+        workers = 1
+        resume = False
+        profile_path = os.path.splitext(os.path.basename(profile))[0] + '.pstats'
 
-            # Emotions by act
-            emotionByAct = vizualisation.Vizualisation(p, "eba")
-            emotionByAct.plot(True)
+    # (1), (3) to (9) Makes the whole process for each xml file
+    corpus.Corpus(plays, workers=workers, cache_path=cache_path, resume=resume,
+                  wsd_strategy=wsd_strategy, report_path=report_path, profile_path=profile_path).run()
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Extracts emotions from the plays in theater/.')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='amount of worker processes (default: 1, serial)')
+    parser.add_argument('--wsd-cache', default='cache/disambiguation.sqlite',
+                        help='path to the disambiguation cache (default: cache/disambiguation.sqlite)')
+    parser.add_argument('--no-wsd-cache', action='store_true',
+                        help='always disambiguate, without reading or writing the cache')
+    parser.add_argument('--wsd', choices=disambiguator.Disambiguator.strategies, default='max_similarity',
+                        help='disambiguation strategy, from the slowest to the fastest (default: max_similarity)')
+    parser.add_argument('--restart', action='store_true',
+                        help='processes every play again, ignoring previous runs')
+    parser.add_argument('--report', default='cache/report.json',
+                        help='path to the JSON report of the time spent in each stage (default: cache/report.json)')
+    parser.add_argument('--profile', default=None, metavar='PLAY',
+                        help='profiles the processing of a single xml file with cProfile')
+    args = parser.parse_args()
+
+    main(workers=args.workers, cache_path=None if args.no_wsd_cache else args.wsd_cache,
+         resume=not args.restart, wsd_strategy=args.wsd, report_path=args.report, profile=args.profile)
@@ -0,0 +1,81 @@
+"""
+    Module Manifest
+"""
+
+import json
+import os
+
+class Manifest:
+    """
+        Manifest class.
+
+        It records, for each play processed by a corpus, the
+        fingerprint of the run which produced it (hash of the xml
+        file, version of senticnet and pipeline settings) and the
+        files which were produced (CSV and plots).
+
+        A play is up to date when its fingerprint has not changed
+        and all its files still exist, so that it can be skipped.
+    """
+
+    def __init__(self, path="cache/manifest.json"):
+        """ Loads the manifest, if it exists.
+        Args:
+            path (str): Path to the manifest file.
+        """
+
+        self.path = path
+        self.plays = {}
+
+        try:
+            with open(path, encoding='utf-8') as manifestFile:
+                self.plays = json.load(manifestFile).get('plays', {})
+
+        except (IOError, ValueError, AttributeError):
+            self.plays = {}
+
+    def isUpToDate(self, play_path, fingerprint):
+        """ Tells whether a play was already processed with the same fingerprint.
+        Args:
+            play_path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of the current run.
+        Returns: bool
+            True if the play can be skipped.
+        Examples:
+            >>> manifest.isUpToDate('theater/play.xml', {'xml':'5e1f...', 'senticnet':'a9c2...', 'settings':{}})
+            False
+        """
+
+        entry = self.plays.get(play_path)
+
+        if not entry or entry['fingerprint'] != fingerprint:
+            return False
+
+        return all(os.path.exists(artifact) for artifact in entry['artifacts'])
+
+    def record(self, play_path, fingerprint, artifacts):
+        """ Records a processed play and saves the manifest.
+        Args:
+            play_path (str): Path to the xml file of the play.
+            fingerprint (dict): Fingerprint of the run.
+            artifacts (list): Paths to the files produced for the play.
+        Returns:
+            None
+        """
+
+        self.plays[play_path] = {'fingerprint':fingerprint, 'artifacts':list(artifacts)}
+        self.save()
+
+    def save(self):
+        """ Writes the manifest aside and renames it, so that a
+            crash never leaves a truncated manifest.
+        """
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as manifestFile:
+            json.dump({'plays':self.plays}, manifestFile, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
@@ -2,18 +2,57 @@
     Module Play
 """
 
+import array
+import bisect
+import json
 import re
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
+from lxml import etree
+
+# Parquet export/import is only available with pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 # Custom classes
 import character
+import disambiguator as wsd
+import emotions as vocabulary
+import instrumentation
 import speech
+import speechtable
 
 class Play:
     """ Class Play """
 
-    def __init__(self, path):
+    # Columns of the exported files, in order
+    export_columns = [
+        'id',
+        'speaker',
+        'disambiguation_time',
+        'pywsd_output',
+        'tokens_text',
+        'tokens_emotions',
+        'scene',
+        'primary_emotion',
+        'secondary_emotion',
+        'text_disambiguate',
+        'speech',
+        'wsd_strategy',
+        'division'
+    ]
+
+    # Columns missing from files exported by older versions
+    late_columns = ['wsd_strategy', 'division']
+
+    # Columns of the summary tables, in order (see summaryFrame)
+    summary_columns = ['title', 'author', 'date', 'speaker', 'division', 'scene', 'kind', 'emotion', 'count']
+
+    def __init__(self, path, streaming=False):
         """
             Creates an object from a TEI-encoded theater play.
 
@@ -26,6 +65,8 @@ class Play:
 
             Args:
                 path (str): Path to the xml file
+                streaming (bool): Parses the file incrementally
+                    instead of loading it at once (see parseStream)
             Returns:
                 None
 
@@ -37,97 +78,50 @@ class Play:
         self.title = '?'
         self.author = '?'
         self.date = '?'
-        self.text = '?' # Raw, unstructured text, without speaker
+        self.text = None # Raw, unstructured text, without speaker (see text)
         self.scenes = 0 # Amount of scenes in the play
         self.characters = [] # List of instanciated Character
+        self.character_index = {} # Characters by name (see getCharacter)
         self.speech_amount = 0
+        self.division_starts = [] # Id of the first speech of each division, in reading order
+        self.plot_frames = None # Data of the graphics (see Vizualisation.frames)
 
         # Tries to open the file
         try:
-            with open(self.path, 'r', encoding='utf-8') as xml_file:
-                xml_file = xml_file.read()
-
-                # Removes all <stage> tags before processing
-                xml_file = re.sub(r'<stage>[^<]+?</stage>', ' ', xml_file)
-
-                # Makes a bs object
-                soup = BeautifulSoup(xml_file, 'xml')
-
-                # Gets the title of the play
-                self.title = re.sub(r'\s+', ' ', soup.find('title').text)
-
-                # Gets the author of the play
-                self.author = soup.find('author').text
-
-                # Gets the date of publication
-                self.date = soup.find('imprint').find('date').text
-
-                # Finds all the scenes (if any)
-                scenes = soup.find_all("div", attrs={"type" : "scene"})
-
-                # Finds all acts (if no scene has been found)
-                if len(scenes) < 1:
-                    scenes = soup.find_all("div", attrs={"type" : "act"})
-
-                # Finds body if no scene or act are found
-                if len(scenes) < 1:
-                    scenes = soup.find_all("body")
-
-                # To store speech id
-                speech_id = 1
-
-                # Loops through each scene
-                for s in scenes:
-                    # Increments the number of scenes
-                    self.scenes += 1
-
-                    # Finds all "sp" tags in current scene
-                    tags_sp = s.find_all('sp')
-
-                    # Gets scene number (if available)
-                    try:
-                        scene_number = int(s["n"])
-                    except:
-                        scene_number = 1
-
-                    # Loops through each sp
-                    for _, sp in enumerate(tags_sp):
-                        # Finding speaker
-                        speaker = sp.find('speaker').text
-
-                        # Skipping speakers that have long names
-                        # because it happens that the speech gets confused
-                        # with the speaker's name during encoding
-                        if len(speaker) > 35 or speaker.count(' ') > 5:
-                            continue
-
-                        # Finds all other possible speech that
-                        # a speaker can have (tags p and l)
-                        tags = sp.find_all('p') + sp.find_all('l')
-
-                        # Loops through all tags and adds to dataframe
-                        for tag in tags:
-                            tag = tag.text.strip()
-
-                            # Stores in dataframe for easy retrieval
-                            self.speaker_speech = pd.concat([
-                                self.speaker_speech, self.speaker_speech.from_dict({
-                                    'speaker':[speaker],
-                                    'speech':[
-                                        speech.Speech(
-                                            tag,
-                                            scene_number,
-                                            speech_id)
-                                        ],
-                                    'scene':[scene_number]
-                                })
-                            ], ignore_index=True)
-
-                            # Adds raw text
-                            self.text += ' ' + tag
-
-                            # Increments speech count
-                            speech_id += 1
+            # Extracts (speaker, speech, scene) records from the file
+            with instrumentation.timer('parse'):
+                if streaming:
+                    records = self.parseStream()
+                else:
+                    records = self.parseSoup()
+
+            # Collects the speeches in column buffers
+            table = speechtable.SpeechTable()
+
+            # To store speech id
+            speech_id = 1
+            last_division = None
+
+            # Loops through each record and adds to the table
+            for speaker, tag, scene_number, division in records:
+                table.append(
+                    speaker,
+                    speech.Speech(tag, scene_number, speech_id),
+                    scene_number
+                )
+
+                # Scene numbers may restart in each act: divisions
+                # are told apart by their position instead
+                if division != last_division:
+                    self.division_starts.append(speech_id)
+                    last_division = division
+
+                # Increments speech count
+                speech_id += 1
+
+            # Stores in dataframe for easy retrieval
+            with instrumentation.timer('dataframe'):
+                self.speaker_speech = table.toDataFrame()
 
             self.speech_amount = speech_id
 
@@ -141,6 +135,279 @@ class Play:
         except IOError:
             print('# Note : The supplied file was not found. Skipping process.')
 
+    def parseSoup(self):
+        """ Parses the whole XML file with BeautifulSoup.
+
+            The file is read in memory at once, which is simple
+            but expensive for large plays (see parseStream).
+
+            Args:
+                None
+            Returns: list
+                A list of (speaker, speech, scene, division) tuples,
+                in order, division being the position of the scene
+                (act or body) in the play, from 1.
+        """
+
+        records = []
+
+        with open(self.path, 'r', encoding='utf-8') as xml_file:
+            xml_file = xml_file.read()
+
+            # Removes all <stage> tags before processing
+            xml_file = re.sub(r'<stage>[^<]+?</stage>', ' ', xml_file)
+
+            # Makes a bs object
+            soup = BeautifulSoup(xml_file, 'xml')
+
+            # Gets the title of the play
+            self.title = re.sub(r'\s+', ' ', soup.find('title').text)
+
+            # Gets the author of the play
+            self.author = soup.find('author').text
+
+            # Gets the date of publication
+            self.date = soup.find('imprint').find('date').text
+
+            # Finds all the scenes (if any)
+            scenes = soup.find_all("div", attrs={"type" : "scene"})
+
+            # Finds all acts (if no scene has been found)
+            if len(scenes) < 1:
+                scenes = soup.find_all("div", attrs={"type" : "act"})
+
+            # Finds body if no scene or act are found
+            if len(scenes) < 1:
+                scenes = soup.find_all("body")
+
+            # Loops through each scene
+            for division, s in enumerate(scenes, 1):
+                # Increments the number of scenes
+                self.scenes += 1
+
+                # Finds all "sp" tags in current scene
+                tags_sp = s.find_all('sp')
+
+                # Gets scene number (if available)
+                try:
+                    scene_number = int(s["n"])
+                except:
+                    scene_number = 1
+
+                # Loops through each sp
+                for _, sp in enumerate(tags_sp):
+                    # Finding speaker
+                    speaker = sp.find('speaker').text
+
+                    # Skipping speakers that have long names
+                    # because it happens that the speech gets confused
+                    # with the speaker's name during encoding
+                    if len(speaker) > 35 or speaker.count(' ') > 5:
+                        continue
+
+                    # Finds all other possible speech that
+                    # a speaker can have (tags p and l)
+                    tags = sp.find_all('p') + sp.find_all('l')
+
+                    # Loops through all tags and stores the record
+                    for tag in tags:
+                        records.append((speaker, tag.text.strip(), scene_number, division))
+
+        return records
+
+    def parseStream(self):
+        """ Parses the XML file incrementally with lxml.
+
+            The document is walked as start/end events and every
+            element is discarded as soon as it has been processed,
+            so the parse tree never holds more than the current
+            <sp>: the memory of the tree does not depend on the
+            file size. The extracted records themselves are kept
+            until the end of the walk (the fallback needs all of
+            them), so they still grow with the amount of speeches.
+
+            It extracts the same records as parseSoup, using the
+            same scene > act > body fallback and dropping the
+            same <stage> elements during the walk.
+
+            Args:
+                None
+            Returns: list
+                A list of (speaker, speech, scene, division) tuples,
+                in order (see parseSoup).
+            Examples:
+                >>> play = Play('path/to/file.xml', streaming=True)
+        """
+
+        # Speeches found in each <sp>, with their enclosing divisions
+        sp_records = []
+
+        # Counters and stacks of currently opened divisions
+        divisions = {'scene': [], 'act': [], 'body': []}
+        found = {'scene': 0, 'act': 0, 'body': 0}
+
+        # Elements that must be kept until their end event
+        captures = []
+        imprint_depth = 0
+
+        events = etree.iterparse(self.path, events=('start', 'end'), recover=True)
+
+        for event, elem in events:
+            # Skips comments and processing instructions
+            if not isinstance(elem.tag, str):
+                continue
+
+            tag = etree.QName(elem).localname
+
+            if event == 'start':
+                # Keeps track of the enclosing scene, act or body
+                division = tag if tag == 'body' else elem.get('type')
+                if tag in ('div', 'body') and division in divisions:
+                    found[division] += 1
+                    divisions[division].append((found[division], elem.get('n')))
+
+                if tag == 'imprint':
+                    imprint_depth += 1
+
+                # Marks elements whose content is needed at their end
+                if (tag == 'sp'
+                        or tag == 'title' and self.title == '?'
+                        or tag == 'author' and self.author == '?'
+                        or tag == 'date' and self.date == '?' and imprint_depth > 0):
+                    captures.append(elem)
+
+                continue
+
+            if captures and captures[-1] is elem:
+                captures.pop()
+
+                if tag == 'sp':
+                    sp_records.append((
+                        tuple(divisions['scene']),
+                        tuple(divisions['act']),
+                        tuple(divisions['body']),
+                        self.readSp(elem)
+                    ))
+                elif tag == 'title':
+                    self.title = re.sub(r'\s+', ' ', self.elementText(elem))
+                elif tag == 'author':
+                    self.author = self.elementText(elem)
+                else:
+                    self.date = self.elementText(elem)
+
+            # Leaves the division once all its speeches have been read
+            division = tag if tag == 'body' else elem.get('type')
+            if tag in ('div', 'body') and division in divisions:
+                divisions[division].pop()
+
+            if tag == 'imprint':
+                imprint_depth -= 1
+
+            # Frees the element (and its processed siblings)
+            # unless an enclosing element still needs it
+            if not captures:
+                elem.clear(keep_tail=True)
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
+        # Uses scenes, then acts, then the whole body
+        if found['scene'] > 0:
+            level = 0
+            self.scenes += found['scene']
+        elif found['act'] > 0:
+            level = 1
+            self.scenes += found['act']
+        else:
+            level = 2
+            self.scenes += found['body']
+
+        # Groups speeches by division, like a find_all on each
+        # division would (nested divisions repeat their speeches)
+        by_division = {}
+        for sp_record in sp_records:
+            for division in sp_record[level]:
+                by_division.setdefault(division, []).append(sp_record[3])
+
+        records = []
+
+        for division in sorted(by_division):
+            # Gets scene number (if available)
+            try:
+                scene_number = int(division[1])
+            except (TypeError, ValueError):
+                scene_number = 1
+
+            for speaker, speeches in by_division[division]:
+                # Skips <sp> without speaker or with a long name
+                # (see parseSoup)
+                if speaker is None or len(speaker) > 35 or speaker.count(' ') > 5:
+                    continue
+
+                for text in speeches:
+                    records.append((speaker, text, scene_number, division[0]))
+
+        return records
+
+    def readSp(self, sp):
+        """ Reads the speaker and the speeches of a <sp> element.
+
+            Args:
+                sp (lxml.etree._Element): The <sp> element.
+            Returns: tuple
+                The speaker (or None) and the list of speeches
+                (all <p> tags, then all <l> tags).
+        """
+
+        speaker = None
+        paragraphs = []
+        lines = []
+
+        for elem in sp.iterdescendants():
+            if not isinstance(elem.tag, str):
+                continue
+
+            tag = etree.QName(elem).localname
+
+            if tag == 'speaker' and speaker is None:
+                speaker = self.elementText(elem)
+            elif tag == 'p':
+                paragraphs.append(self.elementText(elem).strip())
+            elif tag == 'l':
+                lines.append(self.elementText(elem).strip())
+
+        return (speaker, paragraphs + lines)
+
+    @staticmethod
+    def elementText(elem):
+        """ Returns the text of an element and its descendants.
+
+            Plain <stage> elements (no attribute, text only) are
+            replaced by a space, like the regex used in parseSoup.
+
+            Args:
+                elem (lxml.etree._Element): The element.
+            Returns: str
+                The text of the element.
+        """
+
+        parts = [elem.text or '']
+
+        for child in elem:
+            if not isinstance(child.tag, str):
+                pass
+            elif (etree.QName(child).localname == 'stage'
+                    and not child.attrib
+                    and len(child) == 0
+                    and child.text):
+                parts.append(' ')
+            else:
+                parts.append(Play.elementText(child))
+
+            parts.append(child.tail or '')
+
+        return ''.join(parts)
+
+    @instrumentation.timed('characters')
     def makeCharacters(self):
         """ Creates a list of Characters to handle speeches easily.
             Returns a list of Character instances.
@@ -159,29 +426,44 @@ class Play:
 
             """
 
-        # Gets a list of unique names for the characters
-        characters = self.speaker_speech.speaker.unique()
-
-        # Loops through each name and adds speech to character object
-        for char in characters:
-            speeches_df   = self.speaker_speech[self.speaker_speech.speaker == char]
-            speeches_list = []
-
-            # Skips names appearing once (mistakes while encoding the XML)
-            if len(speeches_df) < 2:
-                continue
-
-            # Adds each speech object to a temporary list
-            for _, row in speeches_df.iterrows():
-                speeches_list.append(row.speech)
+        speeches = self.speaker_speech.speech.tolist()
 
+        # Groups the speeches by speaker in a single pass, keeping
+        # their order and skipping names appearing once
+        for char, rows in self.groupRows(self.speaker_speech.speaker):
             # Creates Character instance and links speeches to it
             newCharacter = character.Character(char)
-            newCharacter.speeches = speeches_list
+            newCharacter.speeches = [speeches[i] for i in rows]
 
             # Stores Character instance in self.characters (list)
             self.characters.append(newCharacter)
 
+        self.indexCharacters()
+
+    def indexCharacters(self):
+        """ Indexes the characters of the play by name (see getCharacter),
+            and forgets the data of the graphics of former characters.
+            Returns:
+                None
+        """
+
+        self.character_index = {c.name:c for c in self.characters}
+        self.plot_frames = None
+
+    def getCharacter(self, name):
+        """ Finds a character by name, without scanning the characters.
+            Args:
+                name (str): The name of the character.
+            Returns: Character
+                The character, or None if the play has no such character.
+            Examples:
+                >>> play = Play('path/to/file.xml')
+                >>> play.getCharacter('HAMLET')
+                <character.Character object at 0x000001E5F1B0F048>
+        """
+
+        return self.character_index.get(name)
+
     def getCharacters(self):
         """ Displays all characters in the play.
             Returns a list of characters.
@@ -203,10 +485,214 @@ class Play:
 
         return character_names
 
+    def getSpeeches(self):
+        """ Returns the speeches of every character, character by character.
+            Returns a list of Speech instances.
+            Args:
+                None
+            Returns: list
+                A list of Speech instances.
+        """
+
+        return [s for char in self.characters for s in char.speeches]
+
+    def scoreEmotions(self, stcnet, cache=None, disambiguator=None, strategy='max_similarity'):
+        """ Gets primary and secondary emotions for every speech of
+            the characters of the play, in a single batch
+            (see scoreSpeeches).
+            Args:
+                stcnet (Senticnet): The senticnet dictionnary
+                cache (DisambiguationCache): Optional cache of pywsd outputs
+                disambiguator (Disambiguator): Optional disambiguator, a new
+                    one shared by the speeches of the play by default
+                strategy (str): Disambiguation strategy of the new
+                    disambiguator (see Disambiguator.strategies)
+            Returns:
+                None
+            Examples:
+                >>> play = Play('path/to/file.xml')
+                >>> play.scoreEmotions(senticnet.Senticnet())
+                >>> play.scoreEmotions(senticnet.Senticnet(), strategy='first_sense')
+        """
+
+        self.scoreSpeeches(self.getSpeeches(), stcnet, cache, disambiguator, strategy)
+
+        # Graphics are prepared again with the new emotions
+        self.plot_frames = None
+
+        print(f'# Successfully extracted emotions for play "{self.title}"')
+
+    @staticmethod
+    def disambiguateSpeeches(speeches, cache=None, disambiguator=None, strategy='max_similarity'):
+        """ Disambiguates a list of speeches in a single pass, with
+            one disambiguator sharing its WordNet lookups and
+            similarity scores between all the speeches (see
+            Disambiguator). Outputs are the same as those of
+            Speech.disambiguate, and each speech keeps its own
+            disambiguation time.
+
+            Speeches already disambiguated are left as they are.
+
+            Args:
+                speeches (list): Speech instances
+                cache (DisambiguationCache): Optional cache of pywsd outputs
+                disambiguator (Disambiguator): Optional disambiguator, a new
+                    one by default
+                strategy (str): Disambiguation strategy of the new
+                    disambiguator (see Disambiguator.strategies)
+            Returns: Disambiguator
+                The disambiguator, to be shared with further speeches
+            Examples:
+                >>> d = Play.disambiguateSpeeches(play.getSpeeches())
+                >>> d.hitRate
+                0.93
+        """
+
+        if disambiguator is None:
+            disambiguator = wsd.Disambiguator(strategy)
+
+        for s in speeches:
+            if not s.isDisambiguated:
+                s.disambiguate(cache, disambiguator)
+                print(f'# Successfully disambiguated speech {s.id} in {s.disambiguation_time}s')
+
+        return disambiguator
+
+    @staticmethod
+    def scoreSpeeches(speeches, stcnet, cache=None, disambiguator=None, strategy='max_similarity'):
+        """ Gets primary and secondary emotions for a list of speeches.
+
+            It fills the same attributes as Speech.getEmotions, but
+            each distinct (token, synset) pair is resolved only once
+            for all the speeches, and the modes of all the speeches
+            are computed at once with numpy: tokens are mapped to
+            integer emotion codes, counted per speech with bincount
+            and the most frequent emotion is kept if it is not tied.
+
+            Speeches are first disambiguated together (see
+            disambiguateSpeeches).
+
+            Args:
+                speeches (list): Speech instances
+                stcnet (Senticnet): The senticnet dictionnary
+                cache (DisambiguationCache): Optional cache of pywsd outputs
+                disambiguator (Disambiguator): Optional disambiguator, a new
+                    one shared by the speeches by default
+                strategy (str): Disambiguation strategy of the new
+                    disambiguator (see Disambiguator.strategies)
+            Returns:
+                None
+        """
+
+        # Verifes that stcnet is a senticnet dict
+        if not stcnet.senticnet or not speeches:
+            return
+
+        Play.disambiguateSpeeches(speeches, cache, disambiguator, strategy)
+
+        # (token, synset name) pair of each token
+        token_keys = []
+        lengths = []
+
+        # Tokenizes every speech once (see Speech.tokenize)
+        for s in speeches:
+            tokens = s.tokenize(cache)
+
+            # Name of the synset found by pywsd for each token, if any
+            names = [name for (_, _, name) in s.pywsdNames[:len(tokens)]]
+            names += [None] * (len(tokens) - len(names))
+
+            token_keys.extend(zip(tokens, names))
+            lengths.append(len(tokens))
+
+        instrumentation.stages.count('speeches', len(speeches))
+        instrumentation.stages.count('tokens', len(token_keys))
+
+        # Resolves each distinct pair once
+        with instrumentation.timer('senticnet'):
+            pair_codes = {key:i for i, key in enumerate(dict.fromkeys(token_keys))}
+            pair_emotions = np.array(
+                [stcnet.tokenEmotionCodes(t, speech.Speech.synsetOf(name)) for (t, name) in pair_codes],
+                dtype=np.int64
+            ).reshape(-1, 2)
+            token_pairs = list(map(pair_codes.__getitem__, token_keys))
+
+        # Emotion codes of each pair (see the emotions module)
+        pair_primary = pair_emotions[:, 0]
+        pair_secondary = pair_emotions[:, 1]
+        emotions = vocabulary.names
+
+        pair_index = np.array(token_pairs, dtype=np.int64)
+        segments = np.repeat(np.arange(len(speeches)), lengths)
+
+        modes = []
+        for lookup in (pair_primary, pair_secondary):
+            # Counts each emotion code in each speech
+            counts = np.bincount(
+                segments * len(emotions) + lookup[pair_index],
+                minlength=len(speeches) * len(emotions)
+            ).reshape(len(speeches), len(emotions))
+
+            # None is never the mode
+            counts[:, 0] = 0
+
+            # Keeps the most frequent emotion unless it is tied
+            # with another one (or if no emotion was found at all)
+            best = counts.argmax(axis=1)
+            ordered = np.sort(counts, axis=1)
+            untied = ordered[:, -1] > (ordered[:, -2] if len(emotions) > 1 else 0)
+
+            modes.append(np.where(untied, best, 0).tolist())
+
+        # Emotion codes of each token (primary, secondary), as stored by Speech
+        token_codes = np.stack((pair_primary[pair_index], pair_secondary[pair_index]), axis=1).astype(np.uint16)
+
+        # Stores the results in the attributes of each speech
+        start = 0
+        for i, s in enumerate(speeches):
+            end = start + lengths[i]
+            s.tokenized_emotions = array.array('H', token_codes[start:end].tobytes())
+            s.primary_code = modes[0][i]
+            s.secondary_code = modes[1][i]
+            start = end
+
+    @property
+    def text(self):
+        """ Raw, unstructured text of the play, without speaker.
+            It is joined from the speeches on first access. """
+
+        if self._text is None:
+            self._text = ' '.join(['?'] + [s.text for s in self.speaker_speech.speech])
+
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+
+    @property
+    def speaker_speech(self):
+        """ Dataframe of the speeches of the play (speaker, speech, scene).
+            When the play was loaded lazily (see from_csv), it is
+            built on first access, which materializes every speech. """
+
+        if self._speaker_speech is None:
+            self._speaker_speech = self.csvFrame()
+
+        return self._speaker_speech
+
+    @speaker_speech.setter
+    def speaker_speech(self, value):
+        self._speaker_speech = value
+
     @property
     def speechAmount(self):
         """ Displays the amount of speech in the whole play. """
 
+        # Avoids building the speeches of a lazily loaded play
+        if self._speaker_speech is None:
+            return len(self.csv_speeches)
+
         return len(self.speaker_speech)
 
     @property
@@ -214,137 +700,604 @@ class Play:
         """ Displays the length of the play in words.
             Returns the amount of words in the play."""
 
-        words = 0
+        # Sums the cached amount of words of each character
+        return sum(char.countWords for char in self.characters)
 
-        # Loops through each character
-        for char in self.characters:
-            # Loops through each speech
-            for speech in char.speeches:
-                # Increment counter
-                words += speech.countWords
+    def exportColumns(self):
+        """ Collects the exported values of every speech of the
+            characters, column by column, in a single pass.
+            Returns a dict of lists.
+            Args:
+                None
+            Returns: dict
+                A list of values for each name of export_columns.
+            Examples:
+                >>> play.exportColumns()['speaker'][:2]
+                ['HAMLET', 'HAMLET']
+        """
 
-        return words
+        columns = {name:[] for name in self.export_columns}
+        starts = self.divisionStarts()
 
-    def to_csv(self):
+        # Loops through each character
+        for c in self.characters:
+            # Loops through each speech
+            for s in c.speeches:
+                columns['id'].append(s.id)
+                columns['speaker'].append(c.name)
+                columns['disambiguation_time'].append(s.disambiguation_time)
+                columns['pywsd_output'].append(s.pywsd_output)
+                columns['tokens_text'].append(s.tokenized_text)
+                columns['tokens_emotions'].append(s.tokenized_emotions)
+                columns['scene'].append(s.scene)
+                columns['primary_emotion'].append(s.primary_emotion)
+                columns['secondary_emotion'].append(s.secondary_emotion)
+                columns['text_disambiguate'].append(s.text_disambiguate)
+                columns['speech'].append(s.text)
+                columns['wsd_strategy'].append(s.wsd_strategy)
+                columns['division'].append(bisect.bisect_right(starts, s.id))
+
+        return columns
+
+    @instrumentation.timed('export')
+    def to_csv(self, path=None):
         """ Exports a play to a CSV file.
-            Returns a dataframe.
+            Returns the path of the file.
             Args:
-                None
-            Returns: dataframe
-                A dataframe containing all the speeches in the play.
+                path (str): Path of the CSV file, by default
+                    "<title> - Exported.csv" in the current folder
+            Returns: str
+                The path of the CSV file, None if it could not be written.
             Examples:
                 >>> play = Play('path/to/file.xml')
                 >>> play.to_csv()
                 >>> play.to_csv('path/to/file.csv')
-                >>> play.to_csv('path/to/file.csv', index=False)
 
 
                 """
-    
-        # Constructs dataframe
-        export_df = pd.DataFrame(columns=[
-            'id',
-            'speaker',
-            'disambiguation_time',
-            'pywsd_output',
-            'tokens_text',
-            'tokens_emotions',
-            'scene',
-            'primary_emotion',
-            'secondary_emotion',
-            'text_disambiguate',
-            'speech'
-        ])
 
-        # Loops through each character
-        for c in self.characters:
-            # Loops through each speech
-            for s in c.speeches:
-                export_df = pd.concat([export_df,export_df.from_dict({
-                    'id':[s.id],
-                    'speaker':[c.name],
-                    'disambiguation_time':[s.disambiguation_time],
-                    'pywsd_output':[s.pywsd_output],
-                    'tokens_text':[s.tokenized_text],
-                    'tokens_emotions':[s.tokenized_emotions],
-                    'scene':[s.scene],
-                    'primary_emotion':[s.primary_emotion],
-                    'secondary_emotion':[s.secondary_emotion],
-                    'text_disambiguate':[s.text_disambiguate],
-                    'speech':[s.text]
-                })], ignore_index=True)
+        # Constructs dataframe
+        export_df = pd.DataFrame(self.exportColumns(), columns=self.export_columns, dtype=object)
 
         # Saves csv to same folder than the script
         try:
-            csv_name = self.title + ' - Exported.csv'
+            csv_name = path or self.title + ' - Exported.csv'
             export_df.to_csv(csv_name, index=False)
             print('# Successfully exported to csv!')
+            return csv_name
 
         except IOError:
             print('# An error occured while exporting to csv!')
+            return None
+
+    def divisionStarts(self):
+        """ Returns the id of the first speech of each division
+            (scene, act or body) of the play, in reading order.
+
+            They are found when the play is parsed, and exported with
+            the speeches. For a play loaded from a file exported by an
+            older version, a new division is assumed wherever the
+            scene number changes, which merges two following divisions
+            having the same number.
+
+            Returns: list
+                The ids, in increasing order.
+        """
+
+        if self.division_starts:
+            return self.division_starts
+
+        starts = []
+        last_scene = None
+
+        for s in sorted(self.getSpeeches(), key=lambda s: s.id):
+            if s.scene != last_scene:
+                starts.append(s.id)
+                last_scene = s.scene
+
+        return starts
+
+    @staticmethod
+    def divisionStartsOf(ids, divisions):
+        """ Finds the id of the first speech of each division from
+            the exported id and division of each speech.
+            Args:
+                ids (list): The id of each speech.
+                divisions (list): The division of each speech (None
+                    or NaN in files exported by older versions).
+            Returns: list
+                The ids, in increasing order, or an empty list if
+                a division is missing.
+        """
+
+        if any(pd.isna(division) for division in divisions):
+            return []
+
+        starts = []
+        last_division = None
+
+        for speech_id, division in sorted(zip(ids, divisions)):
+            if division != last_division:
+                starts.append(speech_id)
+                last_division = division
+
+        return starts
 
-    def from_csv(self, path):
+    def summaryFrame(self):
+        """ Counts the emotions of the play, by character and scene.
+
+            The table is a compact summary of the play: it is enough
+            to compare plays (see CorpusVizualisation) without loading
+            their speeches again.
+
+            Scenes are numbered by the play, often from 1 in each act:
+            the division column gives their position in the play
+            instead, from 1 (see divisionStarts).
+
+            Returns: dataframe
+                One row per character, division, kind of emotion
+                ('primary' or 'secondary') and emotion, with the
+                amount of speeches. Speeches without emotion are
+                counted with an empty emotion, so that each kind sums
+                up to the amount of speeches.
+            Examples:
+                >>> play.summaryFrame().head(2)
+                                   title  ...  speaker  division  scene     kind  emotion  count
+                0  Hamlet, Prince of ...  ...   HAMLET         1      1  primary      joy      3
+                1  Hamlet, Prince of ...  ...   HAMLET         1      1  primary  sadness      1
+        """
+
+        speakers = []
+        ids = []
+        scenes = []
+        primary = []
+        secondary = []
+
+        for c in self.characters:
+            for s in c.speeches:
+                speakers.append(c.name)
+                ids.append(s.id)
+                scenes.append(s.scene)
+                primary.append(s.primary_code)
+                secondary.append(s.secondary_code)
+
+        # Division of each speech, from the ids of their first speeches
+        divisions = np.searchsorted(self.divisionStarts(), np.array(ids, dtype=np.int64), side='right')
+
+        codes = pd.DataFrame({
+            'speaker':speakers,
+            'division':divisions,
+            'scene':scenes,
+            'primary':primary,
+            'secondary':secondary
+        })
+
+        # Counts each emotion code of each kind in a single groupby
+        # (a division has a single scene number)
+        counts = (
+            codes.melt(id_vars=['speaker', 'division', 'scene'], var_name='kind', value_name='code')
+            .groupby(['speaker', 'division', 'scene', 'kind', 'code'])
+            .size()
+            .reset_index(name='count')
+        )
+
+        counts['emotion'] = np.array(vocabulary.names, dtype=object)[counts.code.to_numpy(dtype=np.int64)]
+        counts['title'] = self.title
+        counts['author'] = self.author
+        counts['date'] = self.date
+
+        return counts[self.summary_columns]
+
+    @instrumentation.timed('export')
+    def to_summary(self, path=None):
+        """ Exports the summary of a play to a CSV file (see summaryFrame).
+            Returns the path of the file.
+            Args:
+                path (str): Path of the CSV file, by default
+                    "<title> - Summary.csv" in the current folder
+            Returns: str
+                The path of the CSV file, None if it could not be written.
+            Examples:
+                >>> play.to_summary()
+                'Hamlet - Summary.csv'
+        """
+
+        try:
+            summary_name = path or self.title + ' - Summary.csv'
+            self.summaryFrame().to_csv(summary_name, index=False)
+            print('# Successfully exported summary to csv!')
+            return summary_name
+
+        except IOError:
+            print('# An error occured while exporting summary to csv!')
+            return None
+
+    @instrumentation.timed('load')
+    def from_csv(self, path, lazy=False):
         """ Loads a play previously exported in a CSV file.
-            Returns a dataframe.
+
+            The file is read once, and speeches are built from its
+            columns, then grouped by speaker in a single pass.
+
+            When loaded lazily, the speeches of a character are only
+            built when they are first accessed, and the dataframe of
+            the play only when it is used (see speaker_speech).
 
             Args:
                 path (str): Path to the CSV file.
+                lazy (bool): Builds speeches when they are accessed.
             Returns:
-                dataframe: Dataframe containing the play.
+                None
             Examples:
                 >>> play.from_csv('play.csv')
+                >>> play.from_csv('play.csv', lazy=True)
 
 
 
         """
 
         try:
-            # Loads CSV
-            csv = pd.read_csv(path)
+            # Loads CSV, speeches being kept as written (an empty
+            # speech is not a missing value)
+            csv = pd.read_csv(path, converters={'speech': str})
 
-            # Empties dataframe
-            self.speaker_speech = pd.DataFrame(columns=['speaker', 'speech', 'scene'])
-            self.characters = [] # List of instanciated Character
+            # Keeps the columns as python lists, built speeches being
+            # stored by row as they are materialized
+            self.csv_columns = {
+                name:csv[name].tolist() if name in csv or name not in self.late_columns else [None] * len(csv)
+                for name in self.export_columns
+            }
+            self.csv_speeches = [None] * len(csv)
 
-            # Finds all characters in the play and create object for each
-            for row in csv.iterrows():
-                # Stores variables used later
-                text = row[1].speech
-                scene = row[1].scene
-                speech_id = row[1].id
+            # Divisions of this file, not of the xml file parsed before
+            self.division_starts = self.divisionStartsOf(self.csv_columns['id'], self.csv_columns['division'])
 
-                # Create new speech object
-                s = speech.Speech(text, scene, speech_id)
+            # Sets max scene value
+            self.scenes = max(self.csv_columns['scene'], default=0)
+            self.speech_amount = max(self.csv_columns['id'], default=0) + 1
+            self.text = None
 
-                # Adds other properties to the object
-                s.pywsd_output = row[1].pywsd_output
-                s.tokenized_text = row[1].tokens_text
-                s.tokenized_emotions = row[1].tokens_emotions
-                s.primary_emotion = row[1].primary_emotion
-                s.secondary_emotion = row[1].secondary_emotion
-                s.text_disambiguate = row[1].text_disambiguate
-                s.disambiguation_time = row[1].disambiguation_time
-
-                # Adds to play dataframe
-                speaker = row[1].speaker
-                self.speaker_speech = pd.concat([self.speaker_speech,self.speaker_speech.from_dict({
-                    'speaker':[speaker],
-                    'speech':[s],
-                    'scene':[scene]
-                })], ignore_index=True)
+            # Builds the dataframe of the play, unless lazy
+            self.speaker_speech = None if lazy else self.csvFrame()
 
-            # Sets max scene value
-            self.scene = scene
+            # Finds all characters in the play and create object for each
+            self.characters = [] # List of instanciated Character
+            for speaker, rows in self.groupRows(csv.speaker):
+                if lazy:
+                    newCharacter = character.Character(
+                        speaker,
+                        loader=lambda rows=rows: self.csvSpeeches(rows)
+                    )
+                else:
+                    newCharacter = character.Character(speaker)
+                    newCharacter.speeches = self.csvSpeeches(rows)
 
-            # Makes character
-            self.makeCharacters()
+                self.characters.append(newCharacter)
+
+            self.indexCharacters()
 
             # Callback
             print("# Successfully loaded state from CSV file!")
 
-        except TypeError:
+        except (IOError, KeyError, TypeError):
             print("# The play state could not be loaded from CSV file!")
 
+    def csvSpeeches(self, rows):
+        """ Returns the Speech objects of rows of the CSV file loaded
+            by from_csv, building those which do not exist yet.
+            Args:
+                rows (list): Positions of the rows in the file.
+            Returns: list
+                The Speech objects, in the order of the rows.
+        """
+
+        columns = self.csv_columns
+        built = self.csv_speeches
+
+        for i in rows:
+            if built[i] is None:
+                # Create new speech object
+                s = speech.Speech(columns['speech'][i], columns['scene'][i], columns['id'][i])
+
+                # Adds other properties to the object
+                s.pywsd_output = columns['pywsd_output'][i]
+                s.tokenized_text = columns['tokens_text'][i]
+                s.tokenized_emotions = columns['tokens_emotions'][i]
+                s.primary_emotion = columns['primary_emotion'][i]
+                s.secondary_emotion = columns['secondary_emotion'][i]
+                s.text_disambiguate = columns['text_disambiguate'][i]
+                s.disambiguation_time = columns['disambiguation_time'][i]
+
+                # Missing strategies are read as NaN
+                strategy = columns['wsd_strategy'][i]
+                s.wsd_strategy = strategy if isinstance(strategy, str) else None
+
+                built[i] = s
+
+        return [built[i] for i in rows]
+
+    def csvFrame(self):
+        """ Builds the dataframe of all the rows of the CSV file
+            loaded by from_csv, in a single construction.
+            Returns: dataframe
+                A dataframe with the columns speaker, speech and scene.
+        """
+
+        return pd.DataFrame({
+            'speaker':self.csv_columns['speaker'],
+            'speech':self.csvSpeeches(range(len(self.csv_speeches))),
+            'scene':self.csv_columns['scene']
+        }, columns=speechtable.SpeechTable.columns, dtype=object)
+
+    @staticmethod
+    def groupRows(speakers):
+        """ Groups rows by speaker, in a single pass, skipping names
+            appearing once (mistakes while encoding the XML).
+            Args:
+                speakers (Series): The speaker of each row.
+            Returns: list
+                A list of (speaker, rows) in order of first appearance,
+                rows being the positions of the speaker's rows, in order.
+            Examples:
+                >>> Play.groupRows(pd.Series(['A', 'B', 'A', 'C', 'C']))
+                [('A', [0, 2]), ('C', [3, 4])]
+        """
+
+        codes, names = pd.factorize(speakers)
+
+        # Rows sorted by speaker, keeping their order for each speaker
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(names))
+        ends = np.cumsum(counts) + np.count_nonzero(codes < 0)
+
+        return [
+            (name, order[end - count:end].tolist())
+            for name, count, end in zip(names, counts, ends)
+            if count >= 2
+        ]
+
+    @staticmethod
+    def arrowSchema():
+        """ Returns the schema of the Parquet export.
+
+            Tokens, pywsd outputs and per-token emotions are typed
+            list (and list of struct) columns instead of strings,
+            synsets being stored by name (e.g. 'hold.v.14').
+        """
+
+        wsd_type = pa.struct([
+            ('word', pa.string()),
+            ('lemma', pa.string()),
+            ('synset', pa.string())
+        ])
+        emotions_type = pa.struct([
+            ('primary_emotion', pa.string()),
+            ('secondary_emotion', pa.string())
+        ])
+
+        return pa.schema([
+            ('id', pa.int64()),
+            ('speaker', pa.string()),
+            ('disambiguation_time', pa.float64()),
+            ('pywsd_output', pa.list_(wsd_type)),
+            ('tokens_text', pa.list_(pa.string())),
+            ('tokens_emotions', pa.list_(emotions_type)),
+            ('scene', pa.int64()),
+            ('primary_emotion', pa.string()),
+            ('secondary_emotion', pa.string()),
+            ('text_disambiguate', pa.string()),
+            ('speech', pa.string()),
+            ('wsd_strategy', pa.string()),
+            ('division', pa.int64())
+        ])
+
+    @staticmethod
+    def arrowList(lists, value_type):
+        """ Builds a list column from python lists (None for a
+            missing list) by flattening them into a single array
+            of values, struct values being given as tuples.
+            Args:
+                lists (list): The list of each row, or None.
+                value_type (DataType): The type of the values.
+            Returns: ListArray
+                The list column.
+        """
+
+        lengths = [len(row) if row is not None else 0 for row in lists]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum(lengths)
+
+        flat = [value for row in lists if row is not None for value in row]
+
+        if pa.types.is_struct(value_type):
+            fields = list(value_type)
+            values = pa.StructArray.from_arrays(
+                [pa.array([value[i] for value in flat], field.type) for i, field in enumerate(fields)],
+                fields=fields
+            )
+        else:
+            values = pa.array(flat, value_type)
+
+        return pa.ListArray.from_arrays(
+            pa.array(offsets),
+            values,
+            type=pa.list_(value_type),
+            mask=pa.array([row is None for row in lists])
+        )
+
+    @staticmethod
+    def pythonLists(column):
+        """ Turns a list column back into python lists (None for
+            a missing list), struct values being given as tuples
+            (see arrowList).
+            Args:
+                column (ListArray): The list column.
+            Returns: list
+                The list of each row, or None.
+        """
+
+        offsets = column.offsets.to_numpy().tolist()
+        values = column.values
+
+        if pa.types.is_struct(values.type):
+            flat = list(zip(*[values.field(i).to_pylist() for i in range(values.type.num_fields)]))
+        else:
+            flat = values.to_pylist()
+
+        valid = column.is_valid().to_pylist()
+
+        return [
+            flat[offsets[i]:offsets[i + 1]] if valid[i] else None
+            for i in range(len(column))
+        ]
+
+    @instrumentation.timed('export')
+    def to_parquet(self, path=None):
+        """ Exports a play to a Parquet file, with typed columns
+            (see arrowSchema), built column by column in a single pass.
+            Returns the path of the file.
+            Args:
+                path (str): Path of the Parquet file, by default
+                    "<title> - Exported.parquet" in the current folder
+            Returns: str
+                The path of the Parquet file, None if it could not be written.
+            Examples:
+                >>> play = Play('path/to/file.xml')
+                >>> play.to_parquet()
+                >>> play.to_parquet('path/to/file.parquet')
+        """
+
+        if pa is None:
+            print('# pyarrow is needed to export to Parquet!')
+            return None
+
+        columns = self.exportColumns()
+        schema = self.arrowSchema()
+
+        # Nested values which are not lists (e.g. strings read from
+        # a CSV file) are exported as missing
+        columns['pywsd_output'] = [
+            s.pywsdNames if isinstance(s.pywsdNames, list) else None
+            for s in self.getSpeeches()
+        ]
+        columns['tokens_text'] = [
+            tokens if isinstance(tokens, list) else None
+            for tokens in columns['tokens_text']
+        ]
+        columns['tokens_emotions'] = [
+            [(e['primary_emotion'], e['secondary_emotion']) for e in emotions]
+            if isinstance(emotions, list) else None
+            for emotions in columns['tokens_emotions']
+        ]
+
+        arrays = []
+        for field in schema:
+            if pa.types.is_list(field.type):
+                arrays.append(self.arrowList(columns[field.name], field.type.value_type))
+            else:
+                arrays.append(pa.array(columns[field.name], field.type))
+
+        # The description of the play is kept in the metadata
+        table = pa.Table.from_arrays(arrays, schema=schema.with_metadata({
+            'emoplay':json.dumps({'title':self.title, 'author':self.author, 'date':self.date})
+        }))
+
+        try:
+            parquet_name = path or self.title + ' - Exported.parquet'
+            pq.write_table(table, parquet_name)
+            print('# Successfully exported to parquet!')
+            return parquet_name
+
+        except IOError:
+            print('# An error occured while exporting to parquet!')
+            return None
+
+    @instrumentation.timed('load')
+    def from_parquet(self, path):
+        """ Loads a play previously exported in a Parquet file
+            (see to_parquet). Unlike from_csv, speeches are fully
+            restored: tokens, per-token emotions and pywsd outputs
+            (with WordNet synsets) get back their original types.
+
+            Args:
+                path (str): Path to the Parquet file.
+            Returns:
+                None
+            Examples:
+                >>> play.from_parquet('play.parquet')
+        """
+
+        if pa is None:
+            print('# pyarrow is needed to load from Parquet!')
+            return
+
+        try:
+            names = pq.read_schema(path).names
+            table = pq.read_table(path, columns=[
+                name for name in self.export_columns
+                if name in names or name not in self.late_columns
+            ]).combine_chunks()
+
+        except (IOError, KeyError, pa.ArrowInvalid):
+            print('# The play state could not be loaded from parquet file!')
+            return
+
+        # Restores the description of the play
+        metadata = json.loads((table.schema.metadata or {}).get(b'emoplay', b'{}'))
+        self.title = metadata.get('title', self.title)
+        self.author = metadata.get('author', self.author)
+        self.date = metadata.get('date', self.date)
+
+        columns = {}
+        for name in self.export_columns:
+            # Late columns missing from older files
+            if name not in table.column_names:
+                columns[name] = [None] * table.num_rows
+                continue
+
+            column = table.column(name).chunk(0) if table.num_rows else None
+            if column is None:
+                columns[name] = []
+            elif pa.types.is_list(column.type):
+                columns[name] = self.pythonLists(column)
+            else:
+                columns[name] = column.to_pylist()
+
+        speeches = speechtable.SpeechTable()
+
+        for i, speaker in enumerate(columns['speaker']):
+            s = speech.Speech(columns['speech'][i], columns['scene'][i], columns['id'][i])
+
+            output = columns['pywsd_output'][i]
+            emotions = columns['tokens_emotions'][i]
+
+            s.pywsd_output = output # Synsets are kept by name
+            s.tokenized_text = columns['tokens_text'][i]
+            s.tokenized_emotions = [
+                {'primary_emotion':primary, 'secondary_emotion':secondary}
+                for primary, secondary in emotions
+            ] if emotions is not None else None
+            s.primary_emotion = columns['primary_emotion'][i]
+            s.secondary_emotion = columns['secondary_emotion'][i]
+            s.text_disambiguate = columns['text_disambiguate'][i]
+            s.disambiguation_time = columns['disambiguation_time'][i]
+            s.wsd_strategy = columns['wsd_strategy'][i]
+
+            speeches.append(speaker, s, s.scene)
+
+        self.speaker_speech = speeches.toDataFrame()
+        self.division_starts = self.divisionStartsOf(columns['id'], columns['division'])
+        self.scenes = max(columns['scene'], default=0)
+        self.speech_amount = max(columns['id'], default=0) + 1
+        self.text = None
+
+        # Makes character
+        self.characters = []
+        self.makeCharacters()
+
+        # Callback
+        print("# Successfully loaded state from parquet file!")
+
     def __str__(self):
         """ Returns the name of the play when printed. """
         return self.title
@@ -2,61 +2,226 @@
     Module senticnet
 """
 
+import collections
+import gc
+import hashlib
+import os
+import pickle
 import sys
+import time
+
+# Custom classes
+import emotions as vocabulary
+import instrumentation
 
 class Senticnet:
     """ Class senticnet """
 
-    def __init__(self, path="senticnet/senticnet.py"):
+    # Bumped whenever the layout of the compiled cache changes
+    cache_format = 2
+
+    @instrumentation.timed('senticnet_load')
+    def __init__(self, path="senticnet/senticnet.py", cache=True, memo_size=100000):
         """
             Loads a senticnet file into a dict.
             The path to the file is given as argument.
             If no path is given, the default path is used.
+
+            The first load compiles the file into a binary cache
+            (same name, .pickle extension) that later loads use
+            instead of parsing the file again. The cache is rebuilt
+            whenever the content of the senticnet file changes.
+
             Args:
                 path (str): path to the senticnet file
+                cache (bool): uses (and writes) the compiled cache
+                memo_size (int): amount of tokens remembered by tokenEmotions
 
         """
 
         self.senticnet = {}
+        self.synonym_index = {} # Synonym -> words having it as synonym
+        self.emotion_index = {} # Word -> (primary, secondary) emotion codes
+        self.version = None # Hash of the senticnet file
+        self.memo_size = memo_size
+        self.clearMemo()
 
         # Tries to open the file
         try:
-            with open(path, 'r', encoding="utf-8") as senticnetFile:
-                senticnetFile = senticnetFile.readlines()
-
-                # Loops through each line
-                for line in senticnetFile:
-                    line = line.strip()
+            self.version = self.hashFile(path)
+            cache_path = os.path.splitext(path)[0] + '.pickle'
 
-                    # Skips comments
-                    if line [0] == '#':
-                        pass
-                    else:
-                        # Tries to get the word
-                        try:
-                            # Gets the word
-                            word = line.split("'] = [")[0].strip()
-                            word = word.replace("senticnet['", '')
-
-                            # Gets the value associated with the word
-                            values = '[' + line.split("'] = [")[1]
-
-                            # Adds to senticnet dict
-                            # Unsafe (because of eval()), but I won't create
-                            # a parser for the values...
-                            self.senticnet[word] = eval(values)
-
-                        # If something goes wrong (comment/wrong-formatted line/etc.)
-                        except IndexError:
-                            pass
-                print(f"# Note : Senticnet successfully loaded with {len(self.senticnet)} entries.")
+            # Loads the compiled cache, if up to date
+            if cache and self.loadCache(cache_path):
                 return
 
+            self.loadSource(path)
+
+            # Indexes synonyms once for reverseSearch
+            self.buildSynonymIndex()
+
+            # Normalizes emotions once into codes
+            self.buildEmotionIndex()
+
+            # Compiles the cache for the next loads
+            if cache:
+                self.saveCache(cache_path)
+            return
+
         except IOError:
             print("# Note : Failed to load senticnet file. Aborting program.")
             sys.exit()
             return
 
+    def loadSource(self, path):
+        """
+            Parses the senticnet python file into the senticnet dict.
+
+            Args:
+                path (str): path to the senticnet file
+            Returns:
+                None
+
+        """
+
+        with open(path, 'r', encoding="utf-8") as senticnetFile:
+            senticnetFile = senticnetFile.readlines()
+
+            # Loops through each line
+            for line in senticnetFile:
+                line = line.strip()
+
+                # Skips comments
+                if line [0] == '#':
+                    pass
+                else:
+                    # Tries to get the word
+                    try:
+                        # Gets the word
+                        word = line.split("'] = [")[0].strip()
+                        word = word.replace("senticnet['", '')
+
+                        # Gets the value associated with the word
+                        values = '[' + line.split("'] = [")[1]
+
+                        # Adds to senticnet dict
+                        # Unsafe (because of eval()), but I won't create
+                        # a parser for the values...
+                        self.senticnet[word] = eval(values)
+
+                    # If something goes wrong (comment/wrong-formatted line/etc.)
+                    except IndexError:
+                        pass
+            print(f"# Note : Senticnet successfully loaded with {len(self.senticnet)} entries.")
+
+    def loadCache(self, cache_path):
+        """
+            Loads the senticnet dict, the synonym index and the
+            emotion index from the compiled cache, if it was built from the current
+            senticnet file.
+
+            Args:
+                cache_path (str): path to the cache file
+            Returns:
+                bool: True if the cache has been loaded
+
+        """
+
+        # The cache only holds strings and lists: pausing the garbage
+        # collector while they are created makes the load much faster
+        gc_enabled = gc.isenabled()
+        gc.disable()
+
+        try:
+            with open(cache_path, 'rb') as cacheFile:
+                compiled = pickle.load(cacheFile)
+
+        # Missing or unreadable cache: the source is parsed instead
+        except (IOError, EOFError, pickle.UnpicklingError):
+            return False
+
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        if compiled.get('format') != self.cache_format or compiled.get('version') != self.version:
+            print("# Note : Senticnet cache is outdated and will be rebuilt.")
+            return False
+
+        self.senticnet = compiled['senticnet']
+        self.synonym_index = compiled['synonym_index']
+        self.emotion_index = compiled['emotion_index']
+
+        # Codes of emotions added to the vocabulary at runtime may
+        # differ from the ones of the process which wrote the cache
+        remap = [vocabulary.codeOf(name) for name in compiled['emotions']]
+        if remap != list(range(len(remap))):
+            pairs = {}
+            self.emotion_index = {
+                word:pairs.setdefault((remap[p], remap[s]), (remap[p], remap[s]))
+                for word, (p, s) in self.emotion_index.items()
+            }
+
+        print(f"# Note : Senticnet successfully loaded from cache with {len(self.senticnet)} entries.")
+        print(f"# Note : Synonym index loaded with {len(self.synonym_index)} synonyms (~{self.synonymIndexSize()} MB).")
+        return True
+
+    def saveCache(self, cache_path):
+        """
+            Writes the senticnet dict, the synonym index and the
+            emotion index (with the vocabulary of its codes) to
+            the compiled cache. The file is written aside and then
+            renamed, so that concurrent loads never read a partial
+            cache.
+
+            Args:
+                cache_path (str): path to the cache file
+            Returns:
+                None
+
+        """
+
+        compiled = {
+            'format':self.cache_format,
+            'version':self.version,
+            'senticnet':self.senticnet,
+            'synonym_index':self.synonym_index,
+            'emotion_index':self.emotion_index,
+            'emotions':list(vocabulary.names)
+        }
+
+        try:
+            temp_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as cacheFile:
+                pickle.dump(compiled, cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+            print("# Note : Senticnet cache successfully compiled.")
+
+        # The cache is optional, loading still succeeded
+        except IOError:
+            print("# Note : Failed to write senticnet cache.")
+
+    @staticmethod
+    def hashFile(path):
+        """
+            Returns the SHA-1 hash of a file, used to know
+            whether the compiled cache is still up to date.
+
+            Args:
+                path (str): path to the file
+            Returns:
+                str: hexadecimal hash of the file
+
+        """
+
+        sha1 = hashlib.sha1()
+
+        with open(path, 'rb') as hashedFile:
+            for block in iter(lambda: hashedFile.read(2**20), b''):
+                sha1.update(block)
+
+        return sha1.hexdigest()
+
     def emotionsOf(self, word):
         """
             Returns the primary and secondary emotions associated
@@ -74,24 +239,31 @@ class Senticnet:
 
         """
 
-        try:
-            # Finds primary and secondary emotion of the word
-            primary_emotion = self.senticnet[word][4]
-            secondary_emotion = self.senticnet[word][5]
-
-            # Replaces # if the emotion is a string (and not None)
-            if primary_emotion:
-                primary_emotion = primary_emotion.replace('#', '')
-            if secondary_emotion:
-                secondary_emotion = secondary_emotion.replace('#', '')
-
-            return {
-                'primary_emotion':primary_emotion,
-                'secondary_emotion':secondary_emotion
-            }
+        primary_emotion, secondary_emotion = self.emotionCodesOf(word)
 
-        except KeyError:
-            return {'primary_emotion':None, 'secondary_emotion':None}
+        return {
+            'primary_emotion':vocabulary.names[primary_emotion],
+            'secondary_emotion':vocabulary.names[secondary_emotion]
+        }
+
+    def emotionCodesOf(self, word):
+        """
+            Returns the codes of the primary and secondary emotions
+            associated with a word given as argument (see the
+            emotions module), 0 if not found.
+
+            Args:
+                word (str): word to search for
+            Returns:
+                tuple: primary and secondary emotion codes
+            Examples:
+                >>> s = Senticnet()
+                >>> s.emotionCodesOf('word')
+                (2, 15)
+
+        """
+
+        return self.emotion_index.get(word, (0, 0))
 
     def synonymsOf(self, word):
         """
@@ -132,15 +304,184 @@ class Senticnet:
 
         """
 
-        found_words = []
+        # Copies the list so that the index cannot be altered
+        return list(self.synonym_index.get(word, []))
+
+    def buildSynonymIndex(self):
+        """
+            Builds the inverted index of synonyms used by
+            reverseSearch, which maps each synonym to the list
+            of words having it as synonym (in senticnet order).
+            The time and memory it takes are printed.
+
+            Args:
+                None
+            Returns:
+                None
+            Examples:
+                >>> s = Senticnet()
+                >>> s.buildSynonymIndex()
+                # Note : Synonym index built with 20000 synonyms in 0.2s (~3.1 MB).
+
+        """
+
+        index_start = time.time()
+        self.synonym_index = {}
 
         # Loops through each entry of senticnet
-        for word, _ in self.senticnet.items():
-            # If word is found as synonym, add it to the list
-            if word in self.synonymsOf(word):
-                found_words.append(word)
+        for word, values in self.senticnet.items():
+            for synonym in values[8:]:
+                words = self.synonym_index.setdefault(synonym, [])
+
+                # Avoids duplicates if a synonym is listed twice
+                if not words or words[-1] != word:
+                    words.append(word)
+
+        index_time = round(time.time() - index_start, 3)
+
+        print(f"# Note : Synonym index built with {len(self.synonym_index)} synonyms in {index_time}s (~{self.synonymIndexSize()} MB).")
+
+    def synonymIndexSize(self):
+        """
+            Estimates the memory used by the synonym index, in MB
+            (keys are shared with the senticnet dict, only the
+            containers are counted).
+
+            Args:
+                None
+            Returns:
+                float: size of the index, rounded to 0.1 MB
+
+        """
+
+        index_size = sys.getsizeof(self.synonym_index)
+        index_size += sum(sys.getsizeof(words) for words in self.synonym_index.values())
+
+        return round(index_size / 2**20, 1)
+
+    def buildEmotionIndex(self):
+        """
+            Builds the index of emotions used by emotionCodesOf,
+            which maps each word to the codes of its primary and
+            secondary emotions. Labels are normalized ('#' removed)
+            once here instead of at each lookup, and identical
+            pairs of codes share a single tuple.
+
+            Args:
+                None
+            Returns:
+                None
+
+        """
+
+        self.emotion_index = {}
+        pairs = {}
+
+        for word, values in self.senticnet.items():
+            try:
+                pair = (vocabulary.codeOf(values[4]), vocabulary.codeOf(values[5]))
+            except IndexError:
+                continue
+
+            self.emotion_index[word] = pairs.setdefault(pair, pair)
+
+    def tokenEmotions(self, token, synset=None):
+        """
+            Finds the emotions of a token of a speech, looking for
+            them (1) directly in senticnet, (2) in the words having
+            the token as synonym, then (3) in the lemmas of the
+            WordNet synset found for the token by pywsd.
+
+            Results are remembered for each (token, synset) pair,
+            so that frequent tokens are only resolved once for all
+            the speeches. The least recently used pairs are
+            forgotten beyond memo_size pairs.
+
+            Args:
+                token (str): token to search for
+                synset (Synset): synset of the token, if any
+            Returns:
+                dict: dict with primary and secondary emotions
+            Examples:
+                >>> s = Senticnet()
+                >>> s.tokenEmotions('bear', wordnet.synset('hold.v.14'))
+                {'primary_emotion': 'ecstasy', 'secondary_emotion': 'delight'}
+
+        """
+
+        primary_emotion, secondary_emotion = self.tokenEmotionCodes(token, synset)
+
+        return {
+            'primary_emotion':vocabulary.names[primary_emotion],
+            'secondary_emotion':vocabulary.names[secondary_emotion]
+        }
 
-        return found_words
+    def tokenEmotionCodes(self, token, synset=None):
+        """
+            Same as tokenEmotions, but returns the codes of the
+            emotions (see the emotions module) instead of their names.
+
+            Args:
+                token (str): token to search for
+                synset (Synset): synset of the token, if any
+            Returns:
+                tuple: primary and secondary emotion codes
+            Examples:
+                >>> s = Senticnet()
+                >>> s.tokenEmotionCodes('bear', wordnet.synset('hold.v.14'))
+                (1, 13)
+
+        """
+
+        key = (token, synset.name() if synset else None)
+
+        try:
+            codes = self.memo[key]
+            self.memo.move_to_end(key)
+            self.memo_hits += 1
+
+        except KeyError:
+            self.memo_misses += 1
+
+            # (1) Verifies if one can find emotions for
+            # the token directly in senticnet
+            codes = self.emotionCodesOf(token)
+
+            # (2) If the emotions are not found, tries to
+            # find the average emotion of the words having
+            # the token as synonym
+            if not codes[0]:
+                codes = self.averageEmotionCodesOf(self.reverseSearch(token))
+
+                # (3) If the emotions are still not found,
+                # tries to find them in NLTK
+                if not codes[0] and synset:
+                    synonyms = [str(lemma.name()) for lemma in synset.lemmas()]
+                    codes = self.averageEmotionCodesOf(synonyms)
+
+            self.memo[key] = codes
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+
+        return codes
+
+    def clearMemo(self):
+        """
+            Forgets the emotions remembered by tokenEmotions
+            and resets its counters.
+
+        """
+
+        self.memo = collections.OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    @property
+    def memoHitRate(self):
+        """ Returns the share of tokenEmotions calls answered by the memo (between 0 and 1). """
+
+        calls = self.memo_hits + self.memo_misses
+        return self.memo_hits / calls if calls else 0
 
     def averageEmotionsOf(self, words):
         """
@@ -166,48 +507,43 @@ class Senticnet:
 
         """
 
+        primary_emotion, secondary_emotion = self.averageEmotionCodesOf(words)
+
+        return {
+            "primary_emotion":vocabulary.names[primary_emotion],
+            "secondary_emotion":vocabulary.names[secondary_emotion]
+        }
+
+    def averageEmotionCodesOf(self, words):
+        """
+            Same as averageEmotionsOf, but returns the codes of the
+            emotions (see the emotions module) instead of their names.
+
+            Args:
+                words (str or list): words to search for
+            Returns:
+                tuple: primary and secondary emotion codes
+            Examples:
+                >>> s = Senticnet()
+                >>> s.averageEmotionCodesOf(['word1', 'word2', 'word3'])
+                (2, 15)
+
+        """
+
         primary_emotions = {}
         secondary_emotions = {}
 
         # Converts to list, if needed
         if isinstance(words, str):
             words = [words]
-        if not isinstance(words, str) and not isinstance(words, list):
-            return {"primary_emotion":None, "secondary_emotion":None}
+        if not isinstance(words, list):
+            return (0, 0)
 
-        # Loops through each word and find associated emotions
+        # Counts the codes of each emotion for each word
         for word in words:
-            emotions = self.emotionsOf(word)
-
-            # Stores each emotion for each word
-            pe = emotions["primary_emotion"]
-            se = emotions["secondary_emotion"]
-
-            # Adds to dict for primary emotions
-            if pe in primary_emotions:
-                primary_emotions[pe] += 1
-            else:
-                primary_emotions[pe] = 1
-
-            # Adds to dict for secondary emotions
-            if se in secondary_emotions:
-                secondary_emotions[se] += 1
-            else:
-                secondary_emotions[se] = 1
-
-        # Sets None to -1 to avoid unusable outputs
-        primary_emotions[None] = -1
-        secondary_emotions[None] = -1
-
-        # Finds average emotions
-        if len(primary_emotions) > 0:
-            primary_max = max(primary_emotions, key=primary_emotions.get)
-        else:
-            primary_max = None
-
-        if len(secondary_emotions) > 0:
-            secondary_max = max(secondary_emotions, key=secondary_emotions.get)
-        else:
-            secondary_max = None
-
-        return {"primary_emotion":primary_max, "secondary_emotion":secondary_max}
+            pe, se = self.emotionCodesOf(word)
+            primary_emotions[pe] = primary_emotions.get(pe, 0) + 1
+            secondary_emotions[se] = secondary_emotions.get(se, 0) + 1
+
+        # Finds average emotions (no emotion is never the average)
+        return (vocabulary.maxOf(primary_emotions), vocabulary.maxOf(secondary_emotions))
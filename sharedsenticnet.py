@@ -0,0 +1,421 @@
+"""
+    Module SharedSenticnet
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+# Custom classes
+import emotions as vocabulary
+import instrumentation
+import senticnet
+
+class SharedSenticnet(senticnet.Senticnet):
+    """
+        SharedSenticnet class.
+
+        It is a read-only senticnet backend that only keeps what
+        EmoPlay reads from senticnet (primary/secondary emotions
+        and synonyms). Emotions are stored as small integer codes
+        and synonyms as offsets into a table of strings, all in
+        flat arrays of a single file which is memory-mapped.
+
+        Because the file is mapped read-only, several processes
+        using the same store share one physical copy of it (the
+        pages of the operating system's file cache) instead of
+        each holding its own dict of lists.
+
+        It offers the same emotionsOf, emotionCodesOf, synonymsOf,
+        reverseSearch and averageEmotionsOf methods as Senticnet.
+    """
+
+    # Identifies store files and the version of their layout
+    magic = b'EMOPLAY-STORE-01'
+
+    @instrumentation.timed('senticnet_load')
+    def __init__(self, path="senticnet/senticnet.py", store=None, memo_size=100000):
+        """
+            Maps the store compiled from a senticnet file.
+            If the store does not exist yet, or was compiled from
+            another version of the senticnet file, it is (re)built
+            from Senticnet (which uses its own compiled cache).
+
+            Args:
+                path (str): path to the senticnet file
+                store (str): path to the store file, by default
+                    the senticnet file with the .store extension
+                memo_size (int): amount of tokens remembered by tokenEmotions
+
+        """
+
+        self.store_path = store or os.path.splitext(path)[0] + '.store'
+        self.synonym_index = None # Stored in the mapped file instead
+        self.mapped = None
+        self.memo_size = memo_size
+        self.clearMemo()
+
+        # Tries to open the file
+        try:
+            self.version = self.hashFile(path)
+
+            # Compiles the store if needed
+            if self.readHeader(self.store_path).get('version') != self.version:
+                self.build(senticnet.Senticnet(path), self.store_path)
+
+            self.open(self.store_path)
+            print(f"# Note : Shared senticnet successfully mapped with {len(self.senticnet)} entries.")
+
+        except IOError:
+            print("# Note : Failed to load senticnet file. Aborting program.")
+            sys.exit()
+
+    @classmethod
+    def readHeader(cls, store_path):
+        """
+            Reads the header of a store file, including the
+            position where its sections start.
+
+            Args:
+                store_path (str): path to the store file
+            Returns:
+                dict: the header, empty if the file is missing
+                    or is not a store
+
+        """
+
+        try:
+            with open(store_path, 'rb') as storeFile:
+                if storeFile.read(len(cls.magic)) != cls.magic:
+                    return {}
+
+                (header_size,) = struct.unpack('<Q', storeFile.read(8))
+                header = json.loads(storeFile.read(header_size))
+
+            # Sections start on the 8-byte boundary after the header
+            header['start'] = -(-(len(cls.magic) + 8 + header_size) // 8) * 8
+            return header
+
+        except (IOError, struct.error, ValueError):
+            return {}
+
+    @classmethod
+    def build(cls, stcnet, store_path):
+        """
+            Compiles a loaded Senticnet into a store file.
+
+            Args:
+                stcnet (Senticnet): the loaded senticnet
+                store_path (str): path to the store file
+            Returns:
+                None
+            Examples:
+                >>> SharedSenticnet.build(Senticnet(), 'senticnet/senticnet.store')
+
+        """
+
+        words = list(stcnet.senticnet)
+
+        # Every headword and synonym, sorted by their utf-8 bytes
+        # so that words can be found by binary search
+        strings = set(words)
+        for values in stcnet.senticnet.values():
+            strings.update(str(synonym) for synonym in values[8:])
+        strings = sorted(string.encode('utf-8') for string in strings)
+        string_ids = {string.decode('utf-8'):i for i, string in enumerate(strings)}
+
+        string_offsets = np.zeros(len(strings) + 1, dtype='<u4')
+        string_offsets[1:] = np.cumsum([len(string) for string in strings])
+
+        # Emotions are interned: code 0 stands for None
+        emotions = []
+        emotion_codes = {None:0}
+        primary = np.zeros(len(strings), dtype='u1')
+        secondary = np.zeros(len(strings), dtype='u1')
+        flags = np.zeros(len(strings), dtype='u1')
+
+        synonym_lists = [[] for _ in strings]
+
+        for word in words:
+            i = string_ids[word]
+            flags[i] = 1
+
+            emotions_of = stcnet.emotionsOf(word)
+            for codes, emotion in ((primary, emotions_of['primary_emotion']),
+                                   (secondary, emotions_of['secondary_emotion'])):
+                if emotion not in emotion_codes:
+                    emotion_codes[emotion] = len(emotions) + 1
+                    emotions.append(emotion)
+                codes[i] = emotion_codes[emotion]
+
+            synonym_lists[i] = [string_ids[str(synonym)] for synonym in stcnet.synonymsOf(word)]
+
+        # Words having each string as synonym, in senticnet order
+        reverse_lists = [[] for _ in strings]
+        for word in words:
+            i = string_ids[word]
+            for synonym in synonym_lists[i]:
+                if not reverse_lists[synonym] or reverse_lists[synonym][-1] != i:
+                    reverse_lists[synonym].append(i)
+
+        sections = {
+            'strings':np.frombuffer(b''.join(strings), dtype='u1'),
+            'string_offsets':string_offsets,
+            'flags':flags,
+            'primary':primary,
+            'secondary':secondary,
+            'order':np.array([string_ids[word] for word in words], dtype='<u4'),
+        }
+        sections.update(cls.flatten('synonym', synonym_lists))
+        sections.update(cls.flatten('reverse', reverse_lists))
+
+        # Places each section on an 8-byte boundary after the header
+        header = {'version':stcnet.version, 'emotions':emotions, 'sections':{}}
+        layout = []
+        offset = 0
+        for name, array in sections.items():
+            header['sections'][name] = [offset, array.dtype.str, len(array)]
+            layout.append((offset, array))
+            offset += -(-array.nbytes // 8) * 8
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        start = -(-(len(cls.magic) + 8 + len(header_bytes)) // 8) * 8
+
+        # Written aside and renamed, in case other processes map it
+        temp_path = f'{store_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as storeFile:
+            storeFile.write(cls.magic + struct.pack('<Q', len(header_bytes)) + header_bytes)
+            for section_offset, array in layout:
+                storeFile.seek(start + section_offset)
+                storeFile.write(array.tobytes())
+            storeFile.truncate(start + offset)
+        os.replace(temp_path, store_path)
+
+        print(f"# Note : Shared senticnet store successfully compiled ({round((start + offset) / 2**20, 1)} MB).")
+
+    @staticmethod
+    def flatten(name, lists):
+        """
+            Flattens a list of lists of ids into an offsets array
+            and a values array (list i is values[offsets[i]:offsets[i+1]]).
+
+            Args:
+                name (str): prefix of the two sections
+                lists (list): the lists of ids
+            Returns:
+                dict: the two arrays, by section name
+
+        """
+
+        offsets = np.zeros(len(lists) + 1, dtype='<u4')
+        offsets[1:] = np.cumsum([len(ids) for ids in lists])
+        values = np.fromiter((i for ids in lists for i in ids), dtype='<u4', count=int(offsets[-1]))
+
+        return {name + '_offsets':offsets, name + '_ids':values}
+
+    def open(self, store_path):
+        """
+            Maps a store file and exposes its sections, both as
+            numpy arrays (for vectorized use) and as memoryviews
+            (for fast single-item access). Neither copies the data.
+
+            Args:
+                store_path (str): path to the store file
+            Returns:
+                None
+
+        """
+
+        header = self.readHeader(store_path)
+        start = header['start']
+
+        with open(store_path, 'rb') as storeFile:
+            self.mapped = mmap.mmap(storeFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Codes of the store -> codes of the emotions vocabulary
+        self.emotion_codes = [0] + [vocabulary.codeOf(name) for name in header['emotions']]
+        self.arrays = {}
+        self.views = {}
+
+        buffer = memoryview(self.mapped)
+        for name, (offset, dtype, count) in header['sections'].items():
+            self.arrays[name] = np.frombuffer(self.mapped, dtype=dtype, count=count, offset=start + offset)
+            size = self.arrays[name].nbytes
+            self.views[name] = buffer[start + offset:start + offset + size].cast(np.dtype(dtype).char)
+
+        self.strings_start = start + header['sections']['strings'][0]
+        self.senticnet = SharedSenticnetView(self)
+
+    def string(self, i):
+        """ Returns the string of a given id. """
+
+        offsets = self.views['string_offsets']
+        return self.mapped[self.strings_start + offsets[i]:self.strings_start + offsets[i + 1]].decode('utf-8')
+
+    def find(self, word):
+        """
+            Finds the id of a string by binary search.
+
+            Args:
+                word (str): string to search for
+            Returns:
+                int: the id of the string, or None if not found
+
+        """
+
+        if not isinstance(word, str):
+            return None
+
+        key = word.encode('utf-8')
+        offsets = self.views['string_offsets']
+        mapped = self.mapped
+        start = self.strings_start
+
+        low = 0
+        high = len(offsets) - 1
+
+        while low < high:
+            middle = (low + high) // 2
+            if mapped[start + offsets[middle]:start + offsets[middle + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(offsets) - 1 and mapped[start + offsets[low]:start + offsets[low + 1]] == key:
+            return low
+
+        return None
+
+    def findWord(self, word):
+        """ Returns the id of a headword, or None if not found. """
+
+        i = self.find(word)
+
+        if i is None or not self.views['flags'][i]:
+            return None
+
+        return i
+
+    def emotionCodesOf(self, word):
+        """
+            Returns the codes of the primary and secondary emotions
+            associated with a word given as argument (see
+            Senticnet.emotionCodesOf).
+
+            Args:
+                word (str): word to search for
+            Returns:
+                tuple: primary and secondary emotion codes
+
+        """
+
+        i = self.findWord(word)
+
+        if i is None:
+            return (0, 0)
+
+        return (
+            self.emotion_codes[self.views['primary'][i]],
+            self.emotion_codes[self.views['secondary'][i]]
+        )
+
+    def synonymsOf(self, word):
+        """
+            Returns the synonyms of a word given as argument
+            (see Senticnet.synonymsOf).
+
+            Args:
+                word (str): word to search for
+            Returns:
+                list: list of synonyms
+
+        """
+
+        i = self.findWord(word)
+
+        if i is None:
+            return []
+
+        return self.stringsOf('synonym', i)
+
+    def reverseSearch(self, word):
+        """
+            Returns the words that have for synonym the given
+            word passed as argument (see Senticnet.reverseSearch).
+
+            Args:
+                word (str): word to search for
+            Returns:
+                list: list of words
+
+        """
+
+        i = self.find(word)
+
+        if i is None:
+            return []
+
+        return self.stringsOf('reverse', i)
+
+    def stringsOf(self, name, i):
+        """ Returns the strings listed for id i in a flattened section. """
+
+        offsets = self.views[name + '_offsets']
+        ids = self.views[name + '_ids']
+
+        return [self.string(j) for j in ids[offsets[i]:offsets[i + 1]]]
+
+    def close(self):
+        """ Unmaps the store file. """
+
+        self.arrays = {}
+        self.views = {}
+        if self.mapped:
+            self.mapped.close()
+            self.mapped = None
+
+class SharedSenticnetView(Mapping):
+    """
+        Read-only dict-like view of a SharedSenticnet, so that
+        code reading stcnet.senticnet keeps working.
+
+        Values only hold what the store keeps: the primary and
+        secondary emotions (indices 4 and 5, without '#') and the
+        synonyms (from index 8). Other fields are None.
+    """
+
+    def __init__(self, store):
+        """ Constructor. """
+        self.store = store
+
+    def __getitem__(self, word):
+        """ Returns the values of a headword. """
+
+        i = self.store.findWord(word)
+
+        if i is None:
+            raise KeyError(word)
+
+        emotions = self.store.emotionsOf(word)
+
+        return [None] * 4 + [
+            emotions['primary_emotion'],
+            emotions['secondary_emotion'],
+            None,
+            None
+        ] + self.store.stringsOf('synonym', i)
+
+    def __iter__(self):
+        """ Iterates over headwords, in senticnet order. """
+
+        for i in self.store.views['order']:
+            yield self.store.string(i)
+
+    def __len__(self):
+        """ Returns the amount of headwords. """
+        return len(self.store.views['order'])
@@ -2,13 +2,19 @@
     Module Speech
 """
 
+import array
+import sys
 import time
 import pywsd
 import nltk
 
 from pywsd.similarity import max_similarity as maxsim
 
-# from nltk.corpus import wordnet
+from nltk.corpus import wordnet
+
+# Custom classes
+import emotions as vocabulary
+import instrumentation
 
 # Uncomment this if needed
 # nltk.download('stopwords')
@@ -26,62 +32,427 @@ class Speech:
         to easily obtain the values they are looking for
         (e.g. the amount of words, the primary/secondary
         emotions of the speech, etc.).
+
+        A speech is processed in stages, each of them run
+        when first needed and kept afterwards:
+
+            (1) Raw tokens of the text (see rawTokens), enough
+                for statistics such as countWords
+
+            (2) Disambiguation and tokens of the disambiguated
+                text (see disambiguate and tokenize)
+
+            (3) Emotions of the tokens and of the speech
+                (see getEmotions)
+
+        Running a stage again clears the stages after it.
     """
 
+    # Speeches have no __dict__: a play can hold tens of thousands
+    __slots__ = (
+        'character', 'id', 'scene', 'text_disambiguate', 'disambiguation_time', 'wsd_strategy',
+        '_text', '_raw_tokens', '_word_count', '_pywsd_output',
+        '_tokenized_text', '_tokenized_emotions', '_primary_emotion', '_secondary_emotion'
+    )
+
+    # Attributes kept by pickling, in the order they are restored (see __getstate__)
+    state_attributes = (
+        'id', 'scene', 'text', 'text_disambiguate', 'disambiguation_time', 'wsd_strategy', 'pywsd_output',
+        'tokenized_text', 'tokenized_emotions', 'primary_emotion', 'secondary_emotion'
+    )
+
+    # WordNet synsets already looked up, by name (see pywsd_output)
+    synset_cache = {}
+
     def __init__(self, text, scene, speech_id):
         """ Constructor. """
 
+        self.character = None # Character the speech is attached to, if any
+        self.scene = scene
+        self.id = speech_id
         self.text = text
         self.text_disambiguate = None
         self.disambiguation_time = -1
+        self.wsd_strategy = None # Disambiguation strategy used (see Disambiguator)
         self.pywsd_output = None
         self.tokenized_text = None
         self.tokenized_emotions = None
-        self.primary_emotion = None
-        self.secondary_emotion = None
-        self.scene = scene
-        self.id = speech_id
+        self._primary_emotion = 0
+        self._secondary_emotion = 0
+
+    @property
+    def text(self):
+        """ Text of the speech. """
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+        self._raw_tokens = None
+        self._word_count = None
+
+        if self.character is not None:
+            self.character.invalidateCounts()
+
+    @property
+    def pywsd_output(self):
+        """ Output of pywsd for the speech, as a list of
+            (word, lemma, synset) tuples, or None.
+            e.g. [('bear', 'bear', Synset('hold.v.14'))]
+
+            It is stored as a flat tuple of interned strings, synsets
+            by name, and built back on access (see pywsdNames).
+        """
+
+        if not isinstance(self._pywsd_output, tuple):
+            return self._pywsd_output # None, or text read from a CSV file
+
+        return self.synsetObjects(self.pywsdNames, self.synset_cache)
+
+    @pywsd_output.setter
+    def pywsd_output(self, value):
+        if isinstance(value, list):
+            intern = self.intern
+            words, lemmas, synsets = zip(*value) if value else ((), (), ())
+
+            flat = [None] * (3 * len(value))
+            flat[0::3] = [intern(word) for word in words]
+            flat[1::3] = [intern(lemma) for lemma in lemmas]
+            flat[2::3] = [
+                intern(synset if isinstance(synset, str) else synset.name()) if synset else None
+                for synset in synsets
+            ]
+            value = tuple(flat)
+
+        self._pywsd_output = value
+
+    @property
+    def pywsdNames(self):
+        """ Output of pywsd for the speech, with synset names instead
+            of synsets (see synsetNames), without any WordNet lookup.
+            e.g. [('bear', 'bear', 'hold.v.14')]
+        """
+
+        output = self._pywsd_output
+
+        if not isinstance(output, tuple):
+            return output
+
+        return list(zip(output[0::3], output[1::3], output[2::3]))
+
+    @property
+    def tokenized_text(self):
+        """ Tokens of the disambiguated speech, as a list, or None
+            (stored as a tuple of interned strings). """
+
+        if isinstance(self._tokenized_text, tuple):
+            return list(self._tokenized_text)
+
+        return self._tokenized_text
+
+    @tokenized_text.setter
+    def tokenized_text(self, value):
+        if isinstance(value, list):
+            intern = self.intern
+            value = tuple([intern(token) for token in value])
+
+        self._tokenized_text = value
+
+    @property
+    def tokenized_emotions(self):
+        """ Emotions of each token, as a list of dicts, or None.
+            e.g. [{'primary_emotion': 'joy', 'secondary_emotion': None}]
+
+            They are stored as an array of emotion codes (primary and
+            secondary, for each token), see the emotions module. Such
+            an array can also be set directly.
+        """
+
+        codes = self._tokenized_emotions
+
+        if not isinstance(codes, array.array):
+            return codes
+
+        names = vocabulary.names
+
+        return [
+            {'primary_emotion':names[codes[i]], 'secondary_emotion':names[codes[i + 1]]}
+            for i in range(0, len(codes), 2)
+        ]
+
+    @tokenized_emotions.setter
+    def tokenized_emotions(self, value):
+        if isinstance(value, list) and all(isinstance(emotions, dict) for emotions in value):
+            code = vocabulary.codeOf
+            value = array.array('H', [
+                code(emotions.get(key))
+                for emotions in value
+                for key in ('primary_emotion', 'secondary_emotion')
+            ])
+
+        self._tokenized_emotions = value
+
+    @staticmethod
+    def intern(value):
+        """ Interns strings, so that equal words are stored once. """
+        return sys.intern(value) if value.__class__ is str else value
+
+    @property
+    def primary_emotion(self):
+        """ Primary emotion of the speech (name, or None). """
+        return vocabulary.names[self._primary_emotion]
+
+    @primary_emotion.setter
+    def primary_emotion(self, value):
+        self.primary_code = vocabulary.codeOf(value)
+
+    @property
+    def primary_code(self):
+        """ Code of the primary emotion of the speech (see the emotions module). """
+        return self._primary_emotion
+
+    @primary_code.setter
+    def primary_code(self, value):
+        self._primary_emotion = value
+        self.emotionsChanged()
+
+    @property
+    def secondary_emotion(self):
+        """ Secondary emotion of the speech (name, or None). """
+        return vocabulary.names[self._secondary_emotion]
+
+    @secondary_emotion.setter
+    def secondary_emotion(self, value):
+        self.secondary_code = vocabulary.codeOf(value)
 
-    def tokenize(self):
-        """ Tokenizes the speech. Returns a list of tokenized words.
+    @property
+    def secondary_code(self):
+        """ Code of the secondary emotion of the speech (see the emotions module). """
+        return self._secondary_emotion
+
+    @secondary_code.setter
+    def secondary_code(self, value):
+        self._secondary_emotion = value
+        self.emotionsChanged()
+
+    def emotionsChanged(self):
+        """ Tells the character of the speech that its emotions
+            changed, so that its cached tallies are recomputed
+            (see Character.tallyEmotions).
+        """
+
+        if self.character is not None:
+            self.character.invalidateEmotions(self.scene)
+
+    def __getstate__(self):
+        """ Returns the state of the speech for pickling.
+
+            WordNet synsets of the pywsd output are replaced by their
+            names, so that speeches can be sent to other processes.
+            The character of the speech is left out.
+        """
+
+        state = {name:getattr(self, name) for name in self.state_attributes}
+        state['pywsd_output'] = self.pywsdNames
+        state['_word_count'] = self._word_count
+
+        return state
+
+    def __setstate__(self, state):
+        """ Restores the state of a pickled speech (see __getstate__).
+            The speech stays attached to its character, if any.
+        """
+
+        if not hasattr(self, 'character'):
+            self.character = None
+
+        for name in self.state_attributes:
+            setattr(self, name, state[name])
+
+        self._word_count = state.get('_word_count')
+
+    @staticmethod
+    def synsetNames(pywsd_output):
+        """ Replaces the synsets of a pywsd output by their names.
+            e.g. [('bear', 'bear', Synset('hold.v.14'))] -> [('bear', 'bear', 'hold.v.14')]
+        """
+
+        return [
+            (word, lemma, synset.name() if synset else None)
+            for (word, lemma, synset) in pywsd_output
+        ]
+
+    @classmethod
+    def synsetOf(cls, name):
+        """ Returns the WordNet synset of a name (None for None),
+            looked up once (see synset_cache).
+        """
+
+        if name is None:
+            return None
+
+        synset = cls.synset_cache.get(name)
+        if synset is None:
+            synset = cls.synset_cache[name] = wordnet.synset(name)
+
+        return synset
+
+    @staticmethod
+    def synsetObjects(pywsd_output, synsets=None):
+        """ Replaces synset names by WordNet synsets (see synsetNames).
+            A dict of the synsets already looked up, by name, can be
+            given to share the lookups between speeches.
+        """
+
+        if synsets is None:
+            synsets = {}
+
+        for (_, _, synset) in pywsd_output:
+            if synset and synset not in synsets:
+                synsets[synset] = wordnet.synset(synset)
+
+        return [
+            (word, lemma, synsets[synset] if synset else None)
+            for (word, lemma, synset) in pywsd_output
+        ]
+
+    def tokenize(self, cache=None, disambiguator=None):
+        """ Tokenizes the disambiguated speech (stage 2), disambiguating
+            it first if needed. Returns a list of tokenized words,
+            computed once.
             e.g. ['Hello', 'world', '!']
+
+            Args:
+                cache (DisambiguationCache): Optional cache of pywsd outputs
+                disambiguator (Disambiguator): Optional disambiguator shared
+                    with other speeches
         """
 
         # Checks if text has already been disambiguated
-        if not self.text_disambiguate:
-            self.disambiguate()
+        if not self.isDisambiguated:
+            self.disambiguate(cache, disambiguator)
             print(f'# Successfully disambiguated speech {self.id} in {self.disambiguation_time}s')
 
-        # NLTK tokenization
-        self.tokenized_text = nltk.word_tokenize(self.text_disambiguate)
+        # NLTK tokenization (timed apart from the disambiguation)
+        if self._tokenized_text is None:
+            with instrumentation.timer('tokenize'):
+                self.tokenized_text = nltk.word_tokenize(self.text_disambiguate)
 
         return self.tokenized_text
 
+    @staticmethod
+    def splitWords(text):
+        """ Splits a text into words and punctuation with a plain
+            regular expression, without disambiguation.
+            e.g. "Hello, world!" -> ['Hello', ',', 'world', '!']
+        """
+
+        return nltk.wordpunct_tokenize(text if isinstance(text, str) else '')
+
+    @property
+    def rawTokens(self):
+        """ Tokens of the raw text of the speech (stage 1).
+            Returns a list of tokens, computed once.
+            e.g. ['Hello', ',', 'world', '!']
+        """
+
+        if self._raw_tokens is None:
+            self._raw_tokens = self.splitWords(self.text)
+            self._word_count = len(self._raw_tokens)
+
+        return self._raw_tokens
+
     @property
     def countWords(self):
         """ Counts the amount of token/words in the speech.
             Returns an integer.
+
+            Words are counted once, on the raw text (see rawTokens),
+            so that statistics never need the speech to be
+            disambiguated. Only the count is kept.
         """
 
-        # Tokenizing if needed
-        if not self.tokenized_text:
-            self.tokenize()
+        if self._word_count is None:
+            self._word_count = len(self.splitWords(self.text))
 
-        return len(self.tokenized_text)
+        return self._word_count
 
-    def disambiguate(self):
-        """ Disambiguates words in a speech. Returns a string.  """
+    @property
+    def isDisambiguated(self):
+        """ Whether the speech went through disambiguation (stage 2). """
+        return self.text_disambiguate is not None
+
+    @property
+    def isScored(self):
+        """ Whether the emotions of the speech were extracted (stage 3). """
+        return self._tokenized_emotions is not None
+
+    @instrumentation.timed('wsd')
+    def disambiguate(self, cache=None, disambiguator=None):
+        """ Disambiguates words in a speech (stage 2). Returns a string.
+            The tokens and emotions of a previous run are cleared.
+
+            If a cache is given, the pywsd output is read from it
+            when the same line has already been disambiguated, and
+            stored into it otherwise.
+
+            If a disambiguator is given, it is used instead of
+            pywsd.disambiguate with max_similarity, with its own
+            strategy (see Disambiguator), and the lookups and
+            similarity scores it remembers are shared with the other
+            speeches it disambiguates. The strategy is kept in
+            wsd_strategy, and is part of the key of cached lines.
+
+            Args:
+                cache (DisambiguationCache): Optional cache of pywsd outputs
+                disambiguator (Disambiguator): Optional disambiguator shared
+                    with other speeches
+        """
+
+        # Clears the following stages
+        self.tokenized_text = None
+        self.tokenized_emotions = None
+        self.primary_emotion = None
+        self.secondary_emotion = None
 
         # Stores start
         disamb_start = time.time()
 
-        # Disambiguates speech
-        self.pywsd_output = pywsd.disambiguate(
-            self.text,
-            algorithm=maxsim,
-            similarity_option='wup',
-            keepLemmas=True,
-        )
+        # Strategy and similarity option of the disambiguation
+        strategy, option = ('max_similarity', 'wup')
+        if disambiguator:
+            strategy, option = (disambiguator.strategy, disambiguator.similarity_option)
+
+        # Lines are not cached without disambiguation
+        if strategy == 'none':
+            cache = None
+
+        # Looks for the line in the cache
+        cached_output = None
+        if cache:
+            cached_output = cache.get(self.text, strategy, option)
+
+        if cached_output is not None:
+            pywsd_output = self.synsetObjects(cached_output, self.synset_cache)
+
+        elif disambiguator:
+            # Disambiguates speech, sharing lookups with other speeches
+            pywsd_output = disambiguator.disambiguate(self.text)
+
+        else:
+            # Disambiguates speech
+            pywsd_output = pywsd.disambiguate(
+                self.text,
+                algorithm=maxsim,
+                similarity_option='wup',
+                keepLemmas=True,
+            )
+
+        if cached_output is None and cache:
+            cache.put(self.text, strategy, option, self.synsetNames(pywsd_output))
+
+        self.pywsd_output = pywsd_output
+        self.wsd_strategy = strategy
 
         # Stores disambiguation time
         self.disambiguation_time = round(time.time() - disamb_start, 3)
@@ -89,7 +460,7 @@ class Speech:
         text_disambiguate = ''
 
         # Builds back the sentence
-        for pywsd_tuple in self.pywsd_output:
+        for pywsd_tuple in pywsd_output:
             # Unpacking tuple of pywsd output
             (word, _, synset) = pywsd_tuple
 
@@ -109,111 +480,81 @@ class Speech:
         """
             Calculates the maximal emotion based on dict
             passed as argument and returns a single emotion.
+            None is returned if the most frequent emotions
+            are tied (see emotions.modeOf).
         """
 
         # Verifies input type to be a dict
-        if isinstance(emotions, dict):
+        if not isinstance(emotions, dict):
             return None
 
-        else:
-            # Sets None value to -1 to avoid meaningless results
-            emotions[None] = -1
+        # Counts by code, None (0) being ignored
+        counts = {}
+        for emotion, count in emotions.items():
+            code = vocabulary.codeOf(emotion)
+            counts[code] = counts.get(code, 0) + count
 
-            # Checks if there is at least one emotion to search for
-            # different than None
-            if len(emotions) > 1:
-                # Finds max
-                emotion_max_01 = max(emotions, key=emotions.get)
-                emotion_max_01_value = emotions[emotion_max_01]
+        return vocabulary.names[vocabulary.modeOf(counts)]
 
-                # Pops out max to see if there is ex-aequo
-                emotions[emotion_max_01] = -1
+    def getEmotions(self, stcnet, cache=None, force=False, disambiguator=None):
+        """ Gets primary and secondary emotion for a speech (stage 3),
+            tokenizing it first if needed. Returns a dict.
 
-                # Recalculates max
-                emotion_max_02 = max(emotions, key=emotions.get)
-                emotion_max_02_value = emotions[emotion_max_02]
+            Emotions already extracted are returned as they are,
+            unless force is True.
 
-                # Checks if the first value is different from the other
-                if (emotion_max_01_value > emotion_max_02_value):
-                    return emotion_max_01
-                # If the values are the same or if no value seems
-                # to be different than the others, returns None
-                else:
-                    return None
-
-            else:
-                return None
-
-    def getEmotions(self, stcnet):
-        """ Gets primary and secondary emotion for a speech.
-            Returns a dict.
+            Args:
+                stcnet (Senticnet): The senticnet dictionnary
+                cache (DisambiguationCache): Optional cache of pywsd outputs
+                force (bool): Extracts the emotions again
+                disambiguator (Disambiguator): Optional disambiguator shared
+                    with other speeches
         """
 
         # Verifes that stcnet is a senticnet dict
         if not stcnet.senticnet:
             return None
 
+        if self.isScored and not force:
+            return {"primary_emotion":self.primary_emotion, "secondary_emotion":self.secondary_emotion}
+
         # Various variables
         p_tokenized_emotions = {}
         s_tokenized_emotions = {}
-        tokenized_emotions = []
+        tokenized_emotions = array.array('H')
 
         # If needs to be tokenized
-        if not self.tokenized_text:
-            self.tokenize()
+        tokenized_text = self.tokenize(cache, disambiguator)
+        pywsd_output = self.pywsd_output
 
         # First, determines emotions for each token
-        iterator = 0
-        for t in self.tokenized_text:
-            # (1) Verifies if one can find emotions for
-            # the token directly in senticnet
-            t_emotions = stcnet.emotionsOf(t)
-
-            # (2) If the emotions are not found, tries to
-            # loop through whole synonyms of senticnet to find
-            # the average emotion associated with the token
-            if not t_emotions["primary_emotion"]:
-                # Finds occurences of word in synonyms
-                t_synonyms = stcnet.reverseSearch(t)
-
-                # Finds average emotions, if possible
-                t_emotions = stcnet.averageEmotionsOf(t_synonyms)
-
-                # (3) If the emotions are still not found,
-                # tries to find them in NLTK
-                if not t_emotions["primary_emotion"]:
-                    emotions_tuple = self.pywsd_output[iterator]
-                    (_, _, synset) = emotions_tuple
-                    if synset:
-                        t_synonyms = [str(lemma.name()) for lemma in synset.lemmas()]
-                        t_emotions = stcnet.averageEmotionsOf(t_synonyms)
-            iterator += 1
-
-            # Gets primary/secondary emotion for current word
-            pe = t_emotions['primary_emotion']
-            se = t_emotions['secondary_emotion']
-
-            # Adds to dict for primary emotions
-            if pe in p_tokenized_emotions:
-                p_tokenized_emotions[pe] += 1
-            else:
-                p_tokenized_emotions[pe] = 1
-
-            # Adds to dict for secondary emotions
-            if se in s_tokenized_emotions:
-                s_tokenized_emotions[se] += 1
-            else:
-                s_tokenized_emotions[se] = 1
-
-            # Adds to list
-            tokenized_emotions.append(t_emotions)
+        with instrumentation.timer('senticnet'):
+            iterator = 0
+            for t in tokenized_text:
+                # Synset found by pywsd for the token, if any
+                synset = None
+                if iterator < len(pywsd_output):
+                    (_, _, synset) = pywsd_output[iterator]
+                iterator += 1
+
+                # Looks for the emotions of the token in senticnet,
+                # then in its synonyms (see Senticnet.tokenEmotions)
+                pe, se = stcnet.tokenEmotionCodes(t, synset)
+
+                # Counts the codes of primary/secondary emotions
+                p_tokenized_emotions[pe] = p_tokenized_emotions.get(pe, 0) + 1
+                s_tokenized_emotions[se] = s_tokenized_emotions.get(se, 0) + 1
+
+                # Adds to array
+                tokenized_emotions.append(pe)
+                tokenized_emotions.append(se)
 
         # Stores the result in an attribute of speech
         self.tokenized_emotions = tokenized_emotions
 
         # Finds mode of the speech and sets as attribute
-        self.primary_emotion = self.getMaxEmotion(p_tokenized_emotions)
-        self.secondary_emotion = self.getMaxEmotion(s_tokenized_emotions)
+        self.primary_code = vocabulary.modeOf(p_tokenized_emotions)
+        self.secondary_code = vocabulary.modeOf(s_tokenized_emotions)
 
         # Success message
         print(f'# Successfully extracted emotions for speech id {self.id}')
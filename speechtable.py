@@ -0,0 +1,64 @@
+"""
+    Module SpeechTable
+"""
+
+import pandas as pd
+
+class SpeechTable:
+    """
+        SpeechTable class.
+
+        It is used to collect the speeches of a play while it is
+        being parsed. Each record is appended to plain python lists
+        (one per column), and the dataframe is only built once, at
+        the end of the parse, which avoids copying the whole table
+        for every new speech.
+    """
+
+    columns = ['speaker', 'speech', 'scene']
+
+    def __init__(self):
+        """ Constructor. """
+
+        self.speaker = []
+        self.speech = []
+        self.scene = []
+
+    def append(self, speaker, speech, scene):
+        """ Adds a speech at the end of the table.
+        Args:
+            speaker (str): The name of the speaker.
+            speech (Speech): The Speech object.
+            scene (int): The scene number.
+        Returns:
+            None
+        Examples:
+            >>> table = SpeechTable()
+            >>> table.append('HAMLET', speech.Speech('To be, or not to be', 1, 1), 1)
+            >>> len(table)
+            1
+        """
+
+        self.speaker.append(speaker)
+        self.speech.append(speech)
+        self.scene.append(scene)
+
+    def toDataFrame(self):
+        """ Builds the dataframe of all the speeches.
+        Returns:
+            dataframe: A dataframe with the columns speaker, speech and scene.
+        Examples:
+            >>> table.toDataFrame()
+                speaker                                      speech scene
+            0    HAMLET  <speech.Speech object at 0x7f9b0c0b0a90>     1
+        """
+
+        return pd.DataFrame({
+            'speaker':self.speaker,
+            'speech':self.speech,
+            'scene':self.scene
+        }, columns=self.columns, dtype=object)
+
+    def __len__(self):
+        """ Returns the amount of speeches in the table. """
+        return len(self.speech)
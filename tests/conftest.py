@@ -0,0 +1,50 @@
+"""
+    Fixtures of the tests of EmoPlay
+"""
+
+import contextlib
+import io
+import os
+
+import pytest
+
+# Custom classes
+import benchmark
+import disambiguator
+import play
+import speech
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def theater(name):
+    """ Returns the path to a play of theater/. """
+    return os.path.join(root, 'theater', name)
+
+@pytest.fixture(scope='session')
+def senticnet_path(tmp_path_factory):
+    """ Path to a small synthetic senticnet, made up from the words
+        of the small plays of the benchmark suite (see
+        benchmark.writeSenticnet), as the real one is not in the tree.
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        plays = [play.Play(theater(name), streaming=True) for name in benchmark.subsets['small']]
+
+    words = [w.lower() for p in plays for s in p.getSpeeches() for w in s.rawTokens]
+    path = tmp_path_factory.mktemp('senticnet') / 'senticnet.py'
+
+    return benchmark.writeSenticnet(str(path), words, size=500)
+
+@pytest.fixture
+def stubbed_wsd(monkeypatch):
+    """ Replaces the disambiguation and the NLTK tokenizer by plain
+        regular expression splits (see Speech.splitWords), so that no
+        NLTK data nor WordNet is needed. Worker processes forked
+        afterwards inherit the stub.
+    """
+
+    monkeypatch.setattr(
+        disambiguator.Disambiguator, 'disambiguate',
+        lambda self, text: [(word, word.lower(), None) for word in speech.Speech.splitWords(text)]
+    )
+    monkeypatch.setattr(speech.nltk, 'word_tokenize', speech.Speech.splitWords)
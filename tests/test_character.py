@@ -0,0 +1,40 @@
+"""
+    Tests of Character
+"""
+
+import os
+
+import pytest
+
+# Custom classes
+import play
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+xml_path = os.path.join(root, 'theater', 'AbrahamLincolnbyJohnDrinkwater11172.xml')
+csv_path = os.path.join(root, 'csv', 'Abraham Lincoln - Exported.csv')
+
+def loadPlay(lazy):
+    """ Loads the exported play of the repository. """
+
+    p = play.Play(xml_path, streaming=True)
+    p.from_csv(csv_path, lazy=lazy)
+    return p
+
+@pytest.mark.parametrize('scene', [0, 1, 2, 3])
+def test_lazy_characters_match_eager_ones(scene):
+    eager = loadPlay(lazy=False)
+    lazy = loadPlay(lazy=True)
+
+    assert [c.name for c in lazy.characters] == [c.name for c in eager.characters]
+
+    for lazy_character, eager_character in zip(lazy.characters, eager.characters):
+        # Scenes are read before the speeches of the lazy character are built
+        assert lazy_character.tallyEmotions(scene) == eager_character.tallyEmotions(scene)
+        assert lazy_character.getEmotions(scene) == eager_character.getEmotions(scene)
+        assert [s.id for s in lazy_character.getSpeeches(scene)] == [s.id for s in eager_character.getSpeeches(scene)]
+
+def test_lazy_character_finds_speeches_of_a_scene():
+    stone = loadPlay(lazy=True).getCharacter('Mr. Stone')
+
+    assert len(stone.getSpeeches(1)) == 26
+    assert stone.getEmotions(1) == {'primary_emotion':'ecstasy', 'secondary_emotion':'delight'}
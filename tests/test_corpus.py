@@ -0,0 +1,59 @@
+"""
+    Tests of the corpus runs of EmoPlay
+"""
+
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Custom classes
+import benchmark
+import corpus
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def theater(name):
+    """ Returns the path to a play of theater/. """
+    return os.path.join(root, 'theater', name)
+
+def runCorpus(folder, monkeypatch, senticnet_path, workers):
+    """ Runs the small plays of the benchmark suite in a folder,
+        and returns the exported files, by name.
+    """
+
+    os.makedirs(folder)
+    monkeypatch.chdir(folder)
+
+    corpus.Corpus(
+        [theater(name) for name in benchmark.subsets['small']],
+        workers=workers,
+        senticnet_path=senticnet_path,
+        cache_path='cache/disambiguation.sqlite',
+        chunk_size=100
+    ).run(plots=False)
+
+    return {name:pd.read_csv(name) for name in sorted(os.listdir(folder)) if name.endswith('.csv')}
+
+def test_parallel_run_matches_serial_run(tmp_path, monkeypatch, senticnet_path, stubbed_wsd):
+    # Workers are forked, so that they inherit the stubbed disambiguation
+    monkeypatch.setattr(
+        corpus, 'ProcessPoolExecutor',
+        functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork'))
+    )
+
+    serial = runCorpus(tmp_path / 'serial', monkeypatch, senticnet_path, workers=1)
+    parallel = runCorpus(tmp_path / 'parallel', monkeypatch, senticnet_path, workers=2)
+
+    assert len(serial) == 2 * len(benchmark.subsets['small'])
+    assert list(serial) == list(parallel)
+    assert all(frame.primary_emotion.notna().any() for name, frame in serial.items() if name.endswith('Exported.csv'))
+
+    for name, frame in serial.items():
+        # Timings differ from one run to the other
+        frame = frame.drop(columns=['disambiguation_time'], errors='ignore')
+        other = parallel[name].drop(columns=['disambiguation_time'], errors='ignore')
+
+        pd.testing.assert_frame_equal(frame, other, obj=name)
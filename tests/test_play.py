@@ -0,0 +1,122 @@
+"""
+    Tests of Play
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+# Custom classes
+import play
+import senticnet
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def theater(name):
+    """ Returns the path to a play of theater/. """
+    return os.path.join(root, 'theater', name)
+
+# Scene numbers restart in each act
+jeremiah = theater('JeremiahADramainNineScenesbyStefanZweig39402.xml')
+poker = theater('PokerbyZoraNealeHurston15902.xml')
+
+def records(p):
+    """ Returns the speeches of a play as plain data, in order. """
+
+    return [(s.id, s.character.name, s.scene, s.text) for s in sorted(p.getSpeeches(), key=lambda s: s.id)]
+
+def scoredPlay(path, senticnet_path):
+    """ Loads a play and scores its speeches. """
+
+    p = play.Play(path, streaming=True)
+    p.scoreEmotions(senticnet.Senticnet(senticnet_path), strategy='none')
+    return p
+
+@pytest.mark.parametrize('name', [
+    'PokerbyZoraNealeHurston15902.xml',
+    'InShadowoftheGlenbyJMJohnMillingtonSynge1618.xml',
+    'AbrahamLincolnbyJohnDrinkwater11172.xml',
+    'JeremiahADramainNineScenesbyStefanZweig39402.xml'
+])
+def test_stream_parser_matches_soup_parser(name):
+    streamed = play.Play(theater(name), streaming=True)
+    souped = play.Play(theater(name))
+
+    assert (streamed.title, streamed.author, streamed.date) == (souped.title, souped.author, souped.date)
+    assert streamed.scenes == souped.scenes
+    assert streamed.division_starts == souped.division_starts
+    assert [c.name for c in streamed.characters] == [c.name for c in souped.characters]
+    assert records(streamed) == records(souped)
+
+def test_csv_round_trip(tmp_path, senticnet_path, stubbed_wsd):
+    source = scoredPlay(jeremiah, senticnet_path)
+    path = source.to_csv(str(tmp_path / 'jeremiah.csv'))
+
+    loaded = play.Play(jeremiah, streaming=True)
+    loaded.from_csv(path)
+
+    assert records(loaded) == records(source)
+    assert [
+        (s.primary_emotion, s.secondary_emotion, s.wsd_strategy) for s in loaded.getSpeeches()
+    ] == [
+        (s.primary_emotion, s.secondary_emotion, s.wsd_strategy) for s in source.getSpeeches()
+    ]
+    assert loaded.summaryFrame().equals(source.summaryFrame())
+
+def test_parquet_round_trip(tmp_path, senticnet_path, stubbed_wsd):
+    pytest.importorskip('pyarrow')
+
+    source = scoredPlay(jeremiah, senticnet_path)
+    path = source.to_parquet(str(tmp_path / 'jeremiah.parquet'))
+
+    loaded = play.Play(poker, streaming=True)
+    loaded.from_parquet(path)
+
+    assert (loaded.title, loaded.author, loaded.date) == (source.title, source.author, source.date)
+    assert records(loaded) == records(source)
+
+    # Speeches are fully restored
+    for a, b in zip(loaded.getSpeeches(), source.getSpeeches()):
+        assert a.pywsdNames == b.pywsdNames
+        assert a.tokenized_text == b.tokenized_text
+        assert a.tokenized_emotions == b.tokenized_emotions
+        assert a.text_disambiguate == b.text_disambiguate
+        assert (a.primary_emotion, a.secondary_emotion) == (b.primary_emotion, b.secondary_emotion)
+
+def test_loaded_files_bring_their_own_divisions(tmp_path):
+    source = play.Play(jeremiah, streaming=True)
+    other = play.Play(poker, streaming=True)
+    path = source.to_csv(str(tmp_path / 'jeremiah.csv'))
+
+    # Loaded into a play parsed from another xml file
+    other.from_csv(path)
+
+    assert len(source.division_starts) == 12
+    assert other.division_starts == source.division_starts
+    assert other.summaryFrame().division.nunique() == 12
+
+def test_older_files_fall_back_to_scene_numbers(tmp_path):
+    source = play.Play(jeremiah, streaming=True)
+    path = str(tmp_path / 'jeremiah.csv')
+    source.to_csv(path)
+
+    # Files exported by older versions have no division column
+    pd.read_csv(path).drop(columns='division').to_csv(path, index=False)
+
+    loaded = play.Play(poker, streaming=True)
+    loaded.from_csv(path)
+
+    assert loaded.division_starts == []
+    assert loaded.divisionStarts()[0] == 1
+
+def test_parquet_keeps_divisions(tmp_path):
+    pytest.importorskip('pyarrow')
+
+    source = play.Play(jeremiah, streaming=True)
+    path = source.to_parquet(str(tmp_path / 'jeremiah.parquet'))
+
+    loaded = play.Play(poker, streaming=True)
+    loaded.from_parquet(path)
+
+    assert loaded.division_starts == source.division_starts
@@ -0,0 +1,50 @@
+"""
+    Tests of the senticnet backends of EmoPlay
+"""
+
+import pytest
+
+# Custom classes
+import senticnet
+import sharedsenticnet
+
+@pytest.fixture(scope='module')
+def backends(senticnet_path):
+    """ The senticnet parsed from its source, loaded from its compiled
+        cache, and mapped from its shared store.
+    """
+
+    source = senticnet.Senticnet(senticnet_path, cache=False)
+    # The first load compiles the cache, the second one reads it
+    senticnet.Senticnet(senticnet_path)
+    cached = senticnet.Senticnet(senticnet_path)
+    shared = sharedsenticnet.SharedSenticnet(senticnet_path)
+
+    return source, cached, shared
+
+@pytest.fixture(scope='module')
+def words(backends):
+    """ Headwords, words only known as synonyms, and misses. """
+
+    source = backends[0]
+    synonyms = {synonym for values in source.senticnet.values() for synonym in values[8:]}
+
+    return sorted(source.senticnet) + sorted(synonyms - set(source.senticnet)) + ['', 'zzz', 'Love', 'a_b']
+
+def test_backends_agree_on_words(backends, words):
+    source, *others = backends
+
+    for stcnet in others:
+        for word in words:
+            assert stcnet.emotionsOf(word) == source.emotionsOf(word), word
+            assert stcnet.emotionCodesOf(word) == source.emotionCodesOf(word), word
+            assert stcnet.synonymsOf(word) == source.synonymsOf(word), word
+            assert sorted(stcnet.reverseSearch(word)) == sorted(source.reverseSearch(word)), word
+            assert stcnet.tokenEmotions(word) == source.tokenEmotions(word), word
+
+def test_backends_agree_on_averages(backends, words):
+    source, *others = backends
+
+    for stcnet in others:
+        for start in range(0, len(words), 7):
+            assert stcnet.averageEmotionsOf(words[start:start + 7]) == source.averageEmotionsOf(words[start:start + 7])
@@ -3,9 +3,15 @@
 """
 
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import numpy as np
 import pandas as pd
 import seaborn as sns
 
+# Custom classes
+import emotions as vocabulary
+import instrumentation
+
 class Vizualisation:
     """
         Vizualisation class.
@@ -13,10 +19,26 @@ class Vizualisation:
         It is used to display statistics of the play.
         Optionnally, each graphic can be exported as svg.
 
+        The data of the graphics is prepared once for a play, and
+        shared by all its vizualisations (see frames).
+
+        Saved graphics are drawn headless, on figures of their own
+        which are not kept by pyplot and are released once saved,
+        so that plays can be plotted one after the other, or in
+        other processes from their data only (see saveAll).
+
     """
 
     vtypes = ["bps", "bpw", "ebc", "eba"]
 
+    # Names of the saved graphics, by vizualisation type
+    names = {
+        "bps":"Bar plot of speeches",
+        "bpw":"Bar plot of words",
+        "ebc":"Emotions for the main characters",
+        "eba":"Emotions by act"
+    }
+
     def __init__(self, play, vtype):
         """
             Constructor of the Vizualisation class.
@@ -31,7 +53,53 @@ class Vizualisation:
 
         self.play = play
         self.vtype = vtype
+        self.title = play.title if play is not None else '?'
+        self.data = None # Data of the graphics (see frames)
+
+    @classmethod
+    def fromFrames(cls, title, frames, vtype):
+        """ Creates a vizualisation from the prepared data of a play,
+            without the play itself (e.g. in another process).
+        Args:
+            title: The title of the play. (str)
+            frames: The data of the graphics (see prepareFrames). (dict)
+            vtype: The type of vizualisation to display. (str)
+        Returns: Vizualisation
+        Examples:
+            >>> frames = Vizualisation.framesOf(play)
+            >>> Vizualisation.fromFrames(play.title, frames, "bps").plot(save=True)
+        """
+
+        viz = cls(None, vtype)
+        viz.title = title
+        viz.data = frames
+
+        return viz
+
+    @classmethod
+    def saveAll(cls, title, frames, vtypes=None):
+        """ Saves every graphic of a play, from its prepared data.
+        Args:
+            title: The title of the play. (str)
+            frames: The data of the graphics (see prepareFrames). (dict)
+            vtypes: The types of vizualisation, all by default. (list)
+        Returns: list
+            The names of the saved files.
+        Examples:
+            >>> Vizualisation.saveAll(play.title, Vizualisation.framesOf(play))
+            ['Hamlet - Bar plot of speeches.svg', ...]
+        """
+
+        names = []
+
+        for vtype in vtypes or cls.vtypes:
+            viz = cls.fromFrames(title, frames, vtype)
+            viz.plot(save=True)
+            names.append(viz.fileName())
+
+        return names
 
+    @instrumentation.timed('plot')
     def plot(self, save=False):
         """
             Calls the right method depending on the vizualisation type,
@@ -56,6 +124,154 @@ class Vizualisation:
         else:
             print("# No plot found!")
 
+    def fileName(self):
+        """ Returns the name of the file the graphic is saved to.
+        Returns: str
+        Examples:
+            >>> Vizualisation(play, "bps").fileName()
+            'Hamlet - Bar plot of speeches.svg'
+        """
+
+        return f"{self.title} - {self.names[self.vtype]}.svg"
+
+    def frames(self):
+        """ Returns the data of the graphics of the play, prepared
+            on first use and kept by the play, so that all its
+            vizualisations share it (see prepareFrames).
+            The play forgets it when its emotions are scored again.
+            Vizualisations made from frames only use those frames.
+        Returns: dict
+            The dataframes of the play, by name.
+        Examples:
+            >>> Vizualisation(play, "ebc").frames()['emotions'].head(2)
+              speaker  emotion  scene
+            0  HAMLET      joy      1
+            1  HAMLET  sadness      1
+        """
+
+        if self.play is not None:
+            return self.framesOf(self.play)
+
+        return self.data
+
+    @staticmethod
+    def framesOf(play):
+        """ Returns the data of the graphics of a play, prepared on
+            first use and kept by the play (see prepareFrames).
+        Args:
+            play: The play to vizualise. (Play)
+        Returns: dict
+            The dataframes of the play, by name.
+        """
+
+        if play.plot_frames is None:
+            play.plot_frames = Vizualisation.prepareFrames(play)
+
+        return play.plot_frames
+
+    @staticmethod
+    @instrumentation.timed('plot_data')
+    def prepareFrames(play):
+        """ Prepares the data of the graphics of a play, in a single
+            pass over its speeches.
+        Args:
+            play: The play to vizualise. (Play)
+        Returns: dict
+            'characters': one row per character (speaker, speeches,
+                words), in the order of the play
+            'emotions': one row per emotion found in a speech
+                (speaker, emotion, scene), primary emotion first,
+                in the order of the speeches of each character
+        """
+
+        names = []
+        speech_counts = []
+        word_counts = []
+
+        speakers = []
+        scenes = []
+        codes = []
+
+        for c in play.characters:
+            names.append(c.name)
+            speech_counts.append(c.countSpeeches)
+            word_counts.append(c.countWords)
+
+            for s in c.speeches:
+                speakers += (c.name, c.name)
+                scenes += (s.scene, s.scene)
+                codes += (s.primary_code, s.secondary_code)
+
+        # Speeches without emotion are dropped at once
+        codes = np.array(codes, dtype=np.int64)
+        found = codes != 0
+
+        return {
+            'characters':pd.DataFrame({
+                'speaker':names,
+                'speeches':speech_counts,
+                'words':word_counts
+            }),
+            'emotions':pd.DataFrame({
+                'speaker':np.array(speakers, dtype=object)[found],
+                'emotion':np.array(vocabulary.names, dtype=object)[codes[found]],
+                'scene':np.array(scenes)[found]
+            })
+        }
+
+    def topCharacters(self, column, amount):
+        """ Returns the characters with the most speeches or words.
+        Args:
+            column: 'speeches' or 'words'. (str)
+            amount: The amount of characters. (int)
+        Returns: dataframe
+            The rows of the characters, the highest first (ties going
+            to the last name in alphabetical order).
+        Examples:
+            >>> Vizualisation(play, "bps").topCharacters('speeches', 2).speaker.tolist()
+            ['HAMLET', 'HORATIO']
+        """
+
+        characters = self.frames()['characters']
+
+        return characters.sort_values([column, 'speaker'], ascending=False).head(amount)
+
+    @staticmethod
+    def newFigure(figsize, save=False):
+        """ Creates the figure and axes of a graphic.
+
+            Graphics to save get a figure which pyplot does not
+            know of (no window, no global state), while displayed
+            ones are drawn by pyplot as usual.
+        Args:
+            figsize: Width and height of the figure, in inches. (tuple)
+            save: If the graphic must be saved. (bool)
+        Returns: tuple
+            The figure and its axes.
+        """
+
+        if save:
+            fig = Figure(figsize=figsize)
+            return (fig, fig.subplots())
+
+        return plt.subplots(figsize=figsize)
+
+    def output(self, fig, save=False):
+        """ Saves the figure of a graphic and releases it, or displays it.
+        Args:
+            fig: The figure of the graphic. (Figure)
+            save: If the graphic must be saved. (bool)
+        Returns: None
+        """
+
+        # If must save the image
+        if save:
+            fig.savefig(self.fileName())
+            fig.clear()
+            print("# Successfully saved figure!")
+        else:
+            plt.show()
+
     def barPlotSpeech(self, save=False):
         """ Displays what speaker spoke the most (speeches).
          Args:
@@ -68,34 +284,19 @@ class Vizualisation:
 
          """
 
-        valeurs = {}
+        top = self.topCharacters('speeches', 5)
 
-        # Make statistics
-        for c in self.play.characters:
-            valeurs[c.name] = c.countSpeeches
-
-        # Orders the dict by the value
-        valeursList = sorted((value, key) for (key, value) in valeurs.items())
-        valeursList.reverse()
-        valeursSorted = dict([(k, v) for v, k in valeursList])
-
-        keys = list(valeursSorted.keys())[:5]
-        values = list(valeursSorted.values())[:5]
+        keys = top.speaker.tolist()
+        values = top.speeches.tolist()
 
         # Renders plot
-        plt.figure(figsize=(8,6))
-        ax = sns.barplot(x=values, y=keys)
-        plt.title('Top 5 characters who spoke the most')
+        fig, ax = self.newFigure((8,6), save)
+        sns.barplot(x=values, y=keys, ax=ax)
+        ax.set_title('Top 5 characters who spoke the most')
         ax.set(xlabel='Speech amount', ylabel='Character')
-        plt.subplots_adjust(left=0.15)
+        fig.subplots_adjust(left=0.15)
 
-        # If must save the image
-        if save:
-            name = self.play.title + " - Bar plot of speeches.svg"
-            plt.savefig(name)
-            print("# Successfully saved figure!")
-        else:
-            plt.show()
+        self.output(fig, save)
 
     def barPlotWords(self, save=False):
         """ Displays what speaker spoke the most (words).
@@ -109,34 +310,19 @@ class Vizualisation:
 
         """
 
-        valeurs = {}
+        top = self.topCharacters('words', 5)
 
-        # Make statistics
-        for c in self.play.characters:
-            valeurs[c.name] = c.countWords
-
-        # Orders the dict by the value
-        valeursList = sorted((value, key) for (key, value) in valeurs.items())
-        valeursList.reverse()
-        valeursSorted = dict([(k, v) for v, k in valeursList])
-
-        keys = list(valeursSorted.keys())[:5]
-        values = list(valeursSorted.values())[:5]
+        keys = top.speaker.tolist()
+        values = top.words.tolist()
 
         # Renders plot
-        plt.figure(figsize=(8,6))
-        ax = sns.barplot(x=values, y=keys)
-        plt.title('Top 5 characters who spoke the most')
+        fig, ax = self.newFigure((8,6), save)
+        sns.barplot(x=values, y=keys, ax=ax)
+        ax.set_title('Top 5 characters who spoke the most')
         ax.set(xlabel='Word amount', ylabel='Character')
-        plt.subplots_adjust(left=0.15)
+        fig.subplots_adjust(left=0.15)
 
-        # If must save the image
-        if save:
-            name = self.play.title + " - Bar plot of words.svg"
-            plt.savefig(name)
-            print("# Successfully saved figure!")
-        else:
-            plt.show()
+        self.output(fig, save)
 
     def emotionsByCharacter(self, save=False):
         """ Displays emotion across acts for some characters.
@@ -150,74 +336,31 @@ class Vizualisation:
 
             """
 
-        # Gets the three characters that spoke the most
-        valeurs = {}
-
-        for c in self.play.characters:
-            valeurs[c.name] = c.countSpeeches
-
-        # Orders the dict by the value
-        valeursList = sorted((value, key) for (key, value) in valeurs.items())
-        valeursList.reverse()
-        valeursSorted = dict([(k, v) for v, k in valeursList])
-
-        keys = list(valeursSorted.keys())[:4]
-
-        # Creates new df with values per speech
-        df = pd.DataFrame(columns=['speaker', 'emotion', 'scene'])
-
-        for c in self.play.characters:
-            for s in c.speeches:
-                emotions = [str(s.primary_emotion), str(s.secondary_emotion)]
-                for e in emotions:
-                    if e != 'nan':
-                        df = pd.concat([df,df.from_dict({
-                            'speaker':[c.name],
-                            'emotion':[e],
-                            'scene':[s.scene]
-                        })], ignore_index=True)
+        # Gets the four characters that spoke the most
+        keys = self.topCharacters('speeches', 4).speaker
 
-        # Drops useless characters
-        df = df[df.speaker.isin(keys) == True]
+        # Emotions of their speeches
+        df = self.frames()['emotions']
+        df = df[df.speaker.isin(keys)]
 
-        # Gets all emotions
-        emotions = df.drop_duplicates(subset=['emotion']).emotion.tolist()
-        emotions.sort()
-        emotions_amount = {}
+        # Keeps the five most frequent emotions only, ties going
+        # to the last emotion in alphabetical order
+        counts = df.groupby('emotion').size().iloc[::-1]
+        kept_emotions = counts.sort_values(ascending=False, kind='stable').index[:5]
 
-        # Gets the five most frequent emotions only
-        for e in emotions:
-            emotions_amount[e] = sum(df['emotion'] == e)
-
-        # Sorts dict by values
-        emotions_amount = sorted(emotions_amount.items(), key=lambda x:x[1])
-        emotions_amount.reverse()
-
-        # Keeps only the first 5 emotions
-        kept_emotions = []
-
-        for i in range(len(emotions_amount)):
-            kept_emotions.append(emotions_amount[i][0])
-
-        kept_emotions = kept_emotions[:5]
-
-        # Drops emotions that are not in the top 5
-        df = df[df.emotion.isin(kept_emotions) == True]
+        df = df[df.emotion.isin(kept_emotions)]
 
         # Renders plot
-        plt.figure(figsize=(16,12))
-        figr = sns.displot(df, x="speaker", hue="emotion", multiple="dodge")
-        figr.set(xlabel='Speaker', ylabel='Emotion count')
-        plt.title('Emotions for the main characters')
-        plt.subplots_adjust(top=0.9)
+        fig, ax = self.newFigure((16,12), save)
 
-        # If must save the image
-        if save:
-            name = self.play.title + " - Emotions for the main characters.svg"
-            plt.savefig(name)
-            print("# Successfully saved figure!")
-        else:
-            plt.show()
+        # Plays without emotions get empty axes
+        if not df.empty:
+            sns.histplot(data=df, x="speaker", hue="emotion", multiple="dodge", ax=ax)
+        ax.set(xlabel='Speaker', ylabel='Emotion count')
+        ax.set_title('Emotions for the main characters')
+        fig.subplots_adjust(top=0.9)
+
+        self.output(fig, save)
 
     def emotionsByAct(self, save=False):
         """ Displays the most frequent emotions for each act.
@@ -230,31 +373,18 @@ class Vizualisation:
             >>> viz.emotionsByAct(save=True)
             """
 
-        # Creates new df with emotions and acts
-        df = pd.DataFrame(columns=['emotion', 'scene'])
-
-        for c in self.play.characters:
-            for s in c.speeches:
-                emotions = [str(s.primary_emotion), str(s.secondary_emotion)]
-                for e in emotions:
-                    if e != 'nan':
-                        df = pd.concat([df,
-                            df.from_dict({
-                                'emotion':[e],
-                                'scene':[str(s.scene)]
-                            })], ignore_index=True)
+        # Emotions with their act or scene, as text
+        df = self.frames()['emotions'][['emotion', 'scene']]
+        df = df.assign(scene=df.scene.astype(str))
 
         # Renders plot
-        plt.figure(figsize=(16,12))
-        fig = sns.histplot(data=df, x="scene", hue="emotion", multiple="dodge", shrink=.8)
-        fig.set(xlabel='Act or Scene', ylabel='Emotions count')
-        plt.title('Emotions for each act or scene in the play')
-        plt.subplots_adjust(top=0.9)
+        fig, ax = self.newFigure((16,12), save)
 
-        # If must save the image
-        if save:
-            name = self.play.title + " - Emotions by act.svg"
-            plt.savefig(name)
-            print("# Successfully saved figure!")
-        else:
-            plt.show()
+        # Plays without emotions get empty axes
+        if not df.empty:
+            sns.histplot(data=df, x="scene", hue="emotion", multiple="dodge", shrink=.8, ax=ax)
+        ax.set(xlabel='Act or Scene', ylabel='Emotions count')
+        ax.set_title('Emotions for each act or scene in the play')
+        fig.subplots_adjust(top=0.9)
+
+        self.output(fig, save)